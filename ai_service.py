@@ -1,18 +1,152 @@
 # ai_service.py
-import requests
+import asyncio
+import httpx
 import json
 import logging
+import random
 import re
-from config import GROQ_API_KEY, GROQ_MODEL, DMT_LABELS, GENERAL_LABELS
+import time
+import unicodedata
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Hashable
+import config
+from config import (GROQ_BASE_URL, GROQ_MODEL, DMT_LABELS, GENERAL_LABELS, GROQ_POOL_SIZE,
+                    GROQ_KEEPALIVE_CONNECTIONS, GROQ_KEEPALIVE_EXPIRY, GROQ_CONNECT_TIMEOUT,
+                    GROQ_CORRECTION_TIMEOUT, GROQ_TITLE_TIMEOUT, CHUNK_CACHE_ENABLED, MODEL_CONTEXT_TOKENS,
+                    DEFAULT_CONTEXT_TOKENS, MAX_CHUNK_TOKENS, CHUNK_OUTPUT_TOKEN_RATIO, CHUNK_SAFETY_MARGIN_TOKENS,
+                    GROQ_MAX_RETRIES, GROQ_RETRY_BASE_DELAY, GROQ_RETRY_MAX_DELAY, TITLE_OUTPUT_TOKENS,
+                    TITLE_CACHE_SIZE, TITLE_CACHE_TTL_HOURS)
+from utils import estimate_tokens
+import metrics
+from chunk_cache import ChunkCache, get_chunk_cache
+from scheduler import get_scheduler
 
 logger = logging.getLogger(__name__)
 
-def correct_and_classify_text(text: str, is_first_chunk: bool, mode: str) -> dict:
-    """Mengirim teks ke Groq API untuk koreksi dan klasifikasi dengan instruksi super detail."""
+CHAT_COMPLETIONS_PATH = "/chat/completions"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Naikkan versi ini setiap kali prompt koreksi/analisis judul diubah agar cache lama tidak dipakai lagi
+CORRECTION_PROMPT_VERSION = "1"
+TITLE_PROMPT_VERSION = "1"
+
+_http_client: httpx.AsyncClient | None = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Mengembalikan klien HTTP asinkron bersama (dibuat saat pertama kali dipakai)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=GROQ_BASE_URL,
+            headers={"Authorization": f"Bearer {config.GROQ_API_KEY}", "Content-Type": "application/json"},
+            limits=httpx.Limits(
+                max_connections=GROQ_POOL_SIZE,
+                max_keepalive_connections=GROQ_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(GROQ_CORRECTION_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+async def warm_up_http_client():
+    """Membuka koneksi ke Groq lebih awal agar panggilan LLM pertama tidak menanggung biaya TCP/TLS."""
+    try:
+        await get_http_client().get("/models", timeout=GROQ_CONNECT_TIMEOUT)
+    except httpx.HTTPError as e:
+        logger.warning(f"Gagal membuka koneksi awal ke Groq: {e}")
+
+async def close_http_client():
+    """Menutup klien HTTP bersama beserta seluruh koneksi di pool."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+def _retry_delay(response: httpx.Response | None, attempt: int) -> float:
+    """Jeda sebelum mencoba ulang: mengikuti Retry-After jika ada, selain itu exponential backoff dengan jitter."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(GROQ_RETRY_MAX_DELAY, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                return min(GROQ_RETRY_MAX_DELAY, max(0.0, delay))
+            except (TypeError, ValueError):
+                pass
+    return min(GROQ_RETRY_MAX_DELAY, GROQ_RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, GROQ_RETRY_BASE_DELAY))
+
+PartialCallback = Callable[[str], Awaitable[None]]
+
+async def _read_event_stream(response: httpx.Response, on_partial: PartialCallback) -> str:
+    """Membaca respons SSE chat-completions dan melaporkan teks yang terkumpul setiap ada potongan baru."""
+    parts: list[str] = []
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+        if delta:
+            parts.append(delta)
+            await on_partial("".join(parts))
+    return "".join(parts)
+
+async def _chat_completion(payload: dict, timeout: float, user_key: Hashable = None, output_tokens: int = 0,
+                           priority: bool = False, on_partial: PartialCallback | None = None, mode: str = "") -> str:
+    """Mengirim permintaan chat-completions ke Groq melalui penjadwal pusat dan mengembalikan isi balasan.
+
+    Dengan `on_partial`, respons diminta dalam mode streaming dan teks parsial dilaporkan selama dibuat.
+    Respons 429/5xx dan kegagalan koneksi (sebelum streaming dimulai) dicoba ulang hingga GROQ_MAX_RETRIES kali.
+    Setiap percobaan mencatat waktu tunggu di penjadwal (`llm_queue_wait`) dan durasi permintaan HTTP (`llm_call`).
+    """
+    tokens = sum(estimate_tokens(message["content"]) for message in payload["messages"]) + output_tokens
+    request_timeout = httpx.Timeout(timeout, connect=GROQ_CONNECT_TIMEOUT)
+    client = get_http_client()
+    scheduler = get_scheduler()
+    for attempt in range(GROQ_MAX_RETRIES + 1):
+        response = None
+        queued = time.perf_counter()
+        async with scheduler.slot(user_key, tokens, priority=priority):
+            metrics.observe_duration("llm_queue_wait", mode, time.perf_counter() - queued)
+            try:
+                with metrics.stage_timer("llm_call", mode):
+                    if on_partial is None:
+                        response = await client.post(CHAT_COMPLETIONS_PATH, json=payload, timeout=request_timeout)
+                    else:
+                        request = client.build_request("POST", CHAT_COMPLETIONS_PATH,
+                                                       json={**payload, "stream": True}, timeout=request_timeout)
+                        response = await client.send(request, stream=True)
+                        try:
+                            if response.status_code == 200:
+                                return await _read_event_stream(response, on_partial)
+                            await response.aread()
+                        finally:
+                            await response.aclose()
+            except (httpx.ConnectError, httpx.RemoteProtocolError):
+                if attempt == GROQ_MAX_RETRIES:
+                    raise
+        if response is not None and (response.status_code not in RETRYABLE_STATUS_CODES or attempt == GROQ_MAX_RETRIES):
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"]
+
+        delay = _retry_delay(response, attempt)
+        if response is not None and response.status_code == 429:
+            # Kuota habis untuk semua pengguna, jadi seluruh antrean ikut menunggu
+            scheduler.backoff(delay)
+        status = response.status_code if response is not None else "koneksi gagal"
+        logger.warning(f"Groq API ({status}), mencoba ulang dalam {delay:.1f} dtk (percobaan {attempt + 1}/{GROQ_MAX_RETRIES}).")
+        metrics.inc("llm_retries", "")
+        await asyncio.sleep(delay)
+
+def _build_correction_prompt(mode: str) -> str:
+    """Menyusun prompt sistem untuk koreksi dan klasifikasi sesuai mode."""
     labels = DMT_LABELS if mode == 'DMT' else GENERAL_LABELS
-    
     # Prompt telah disederhanakan agar lebih jelas dan langsung ke inti
-    system_prompt = f"""
+    return f"""
 Anda adalah asisten yang cerdas dan teliti. Tugas Anda adalah menyunting teks yang diberikan dengan standar PUEBI dan KBBI, serta mengklasifikasikannya jika itu adalah bagian pertama dari dokumen.
 
 **Instruksi:**
@@ -27,20 +161,33 @@ Anda adalah asisten yang cerdas dan teliti. Tugas Anda adalah menyunting teks ya
 
 Hanya outputkan satu blok kode JSON yang valid tanpa teks tambahan di luar blok tersebut.
 """
+
+def correction_chunk_budget() -> int:
+    """Anggaran token per chunk: sisa konteks model setelah prompt sistem, dibagi untuk input dan output."""
+    context_tokens = MODEL_CONTEXT_TOKENS.get(GROQ_MODEL, DEFAULT_CONTEXT_TOKENS)
+    prompt_tokens = max(estimate_tokens(_build_correction_prompt(mode)) for mode in ('DMT', 'Umum'))
+    available = context_tokens - prompt_tokens - CHUNK_SAFETY_MARGIN_TOKENS
+    return max(1, min(MAX_CHUNK_TOKENS, int(available / (1 + CHUNK_OUTPUT_TOKEN_RATIO))))
+
+async def correct_and_classify_text(text: str, is_first_chunk: bool, mode: str, user_key: Hashable = None) -> dict:
+    """Mengirim teks ke Groq API untuk koreksi dan klasifikasi dengan instruksi super detail."""
+    cache = get_chunk_cache() if CHUNK_CACHE_ENABLED else None
+    cache_key = ChunkCache.make_key(text, mode, is_first_chunk, GROQ_MODEL, CORRECTION_PROMPT_VERSION)
+    if cache and (cached := cache.get(cache_key)) is not None:
+        metrics.inc("chunk_cache_hits", mode)
+        return cached
+    if cache:
+        metrics.inc("chunk_cache_misses", mode)
+
+    system_prompt = _build_correction_prompt(mode)
     
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            json={
-                "model": GROQ_MODEL,
-                "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
-                "temperature": 0.1, "top_p": 0.9,
-            },
-            timeout=180
-        )
-        response.raise_for_status()
-        response_content = response.json()["choices"][0]["message"]["content"]
+        response_content = await _chat_completion({
+            "model": GROQ_MODEL,
+            "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
+            "temperature": 0.1, "top_p": 0.9,
+        }, timeout=GROQ_CORRECTION_TIMEOUT, user_key=user_key,
+           output_tokens=int(estimate_tokens(text) * CHUNK_OUTPUT_TOKEN_RATIO), mode=mode)
         
         try:
             json_match = re.search(r"```json\s*(\{.*?\})\s*```", response_content, re.DOTALL)
@@ -52,18 +199,114 @@ Hanya outputkan satu blok kode JSON yang valid tanpa teks tambahan di luar blok
             if 'klasifikasi' in data and not data['klasifikasi']:
                 data['klasifikasi'] = "Tidak Diketahui"
             
+            if cache and 'koreksi_teks' in data:
+                cache.put(cache_key, data)
             return data
         except (ValueError, json.JSONDecodeError, AttributeError) as e:
             logger.error(f"Gagal parsing JSON: {e}. Respon mentah: {response_content}")
             return {"error": "Gagal memahami respons dari AI."}
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error request ke Groq API: {e}")
         return {"error": f"Gagal terhubung ke layanan AI: {e}"}
     except Exception as e:
         logger.error(f"Error tidak terduga di fungsi AI: {e}")
         return {"error": f"Terjadi kesalahan internal pada sistem AI."}
 
-def analyze_title_for_dmt(title: str) -> str:
+def normalize_title(title: str) -> str:
+    """Menyeragamkan judul untuk kunci cache: huruf kecil, tanpa tanda baca, spasi tunggal."""
+    folded = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in title.casefold())
+    return " ".join(folded.split())
+
+class _TitleCache:
+    """Cache LRU dengan TTL untuk hasil analisis judul, plus penggabungan permintaan identik yang sedang berjalan."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                metrics.inc("title_cache_hits", "")
+                return entry[1]
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            # Judul yang sama sedang dianalisis: tunggu hasil panggilan yang sudah berjalan
+            metrics.inc("title_requests_coalesced", "")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Hanya pemanggil pertama yang dibatalkan: salah satu penunggu mengulang panggilannya
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Hindari peringatan "exception never retrieved" bila tidak ada yang menunggu
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if not result.startswith("❌"):
+                self._entries[key] = (time.monotonic(), result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return result
+        finally:
+            del self._inflight[key]
+
+_title_cache = _TitleCache(TITLE_CACHE_SIZE, TITLE_CACHE_TTL_HOURS * 3600)
+
+async def analyze_title_for_dmt(title: str, user_key: Hashable = None,
+                                on_partial: PartialCallback | None = None) -> str:
+    """Menganalisis judul penelitian untuk mode DMT; judul yang setara dilayani dari cache.
+
+    `on_partial` menerima teks parsial selama jawaban di-stream (hanya untuk permintaan yang memanggil LLM).
+    """
+    key = f"dmt:{TITLE_PROMPT_VERSION}:{normalize_title(title)}"
+    return await _title_cache.get_or_compute(key, lambda: _analyze_title_for_dmt(title, user_key, on_partial))
+
+async def analyze_title_with_llm(title: str, user_key: Hashable = None,
+                                 on_partial: PartialCallback | None = None) -> str:
+    """Menganalisis judul penelitian umum; judul yang setara dilayani dari cache.
+
+    `on_partial` menerima teks parsial selama jawaban di-stream (hanya untuk permintaan yang memanggil LLM).
+    """
+    key = f"umum:{TITLE_PROMPT_VERSION}:{normalize_title(title)}"
+    return await _title_cache.get_or_compute(key, lambda: _analyze_title_with_llm(title, user_key, on_partial))
+
+async def _run_title_analysis(system_prompt: str, user_key: Hashable, on_partial: PartialCallback | None) -> str:
+    """Mengirim prompt analisis judul ke LLM; pesan error dikembalikan sebagai teks untuk pengguna."""
+    try:
+        feedback = await _chat_completion({
+            "model": GROQ_MODEL,
+            "messages": [{"role": "system", "content": system_prompt}],
+            "temperature": 0.3,
+        }, timeout=GROQ_TITLE_TIMEOUT, user_key=user_key, output_tokens=TITLE_OUTPUT_TOKENS, priority=True,
+           on_partial=on_partial)
+        return feedback
+    except httpx.HTTPError as e:
+        logger.error(f"Error request ke Groq API saat analisis judul: {e}")
+        return f"❌ Gagal terhubung ke layanan AI: {e}"
+    except Exception as e:
+        logger.error(f"Error tidak terduga di fungsi analisis judul: {e}")
+        return f"❌ Terjadi kesalahan internal pada sistem AI."
+
+async def _analyze_title_for_dmt(title: str, user_key: Hashable = None,
+                                 on_partial: PartialCallback | None = None) -> str:
     """Menganalisis judul penelitian secara spesifik untuk mode DMT (Dewan Musyawarah Taruna)."""
     dmt_commissions = ["KOMISI I", "KOMISI II", "KOMISI III", "KOMISI IV"]
 
@@ -80,29 +323,10 @@ Anda adalah seorang **Dosen Pembimbing Akademik dan Panitia Dewan Musyawarah Tar
 **Format Output:**
 Berikan jawaban dalam format Markdown yang rapi. Gunakan poin-poin dan buatlah agar mudah dibaca. Berikan langsung sebagai teks biasa tanpa format JSON.
 """
-    
-    try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            json={
-                "model": GROQ_MODEL,
-                "messages": [{"role": "system", "content": system_prompt}],
-                "temperature": 0.3,
-            },
-            timeout=120
-        )
-        response.raise_for_status()
-        feedback = response.json()["choices"][0]["message"]["content"]
-        return feedback
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error request ke Groq API saat analisis judul: {e}")
-        return f"❌ Gagal terhubung ke layanan AI: {e}"
-    except Exception as e:
-        logger.error(f"Error tidak terduga di fungsi analisis judul: {e}")
-        return f"❌ Terjadi kesalahan internal pada sistem AI."
+    return await _run_title_analysis(system_prompt, user_key, on_partial)
 
-def analyze_title_with_llm(title: str) -> str:
+async def _analyze_title_with_llm(title: str, user_key: Hashable = None,
+                                  on_partial: PartialCallback | None = None) -> str:
     """Menganalisis judul penelitian menggunakan LLM untuk memberikan feedback mendalam."""
     system_prompt = f"""
 Anda adalah seorang **Dosen Pembimbing Akademik dan Reviewer Jurnal Ilmiah** yang sangat berpengalaman. Tugas Anda adalah memberikan analisis tajam dan konstruktif terhadap judul penelitian berikut.
@@ -118,24 +342,4 @@ Anda adalah seorang **Dosen Pembimbing Akademik dan Reviewer Jurnal Ilmiah** yan
 **Format Output:**
 Berikan jawaban dalam format Markdown yang rapi. Gunakan poin-poin dan buatlah agar mudah dibaca. Jangan memberikan jawaban dalam format JSON. Berikan langsung sebagai teks biasa.
 """
-    
-    try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            json={
-                "model": GROQ_MODEL,
-                "messages": [{"role": "system", "content": system_prompt}],
-                "temperature": 0.3,
-            },
-            timeout=120
-        )
-        response.raise_for_status()
-        feedback = response.json()["choices"][0]["message"]["content"]
-        return feedback
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error request ke Groq API saat analisis judul: {e}")
-        return f"❌ Gagal terhubung ke layanan AI: {e}"
-    except Exception as e:
-        logger.error(f"Error tidak terduga di fungsi analisis judul: {e}")
-        return f"❌ Terjadi kesalahan internal pada sistem AI."
\ No newline at end of file
+    return await _run_title_analysis(system_prompt, user_key, on_partial)
\ No newline at end of file
@@ -0,0 +1,67 @@
+# benchmarks/bench_chunker.py
+"""Micro-benchmark chunker pada dokumen sintetis panjang.
+
+Jalankan dari direktori utama proyek:  python -m benchmarks.bench_chunker
+"""
+import random
+import time
+
+from config import MAX_CHUNK_TOKENS
+from utils import estimate_tokens, split_text_into_logical_chunks
+
+WORDS = ("penelitian analisis data sistem informasi taruna pendidikan metode hasil pembahasan "
+         "kesimpulan laporan kegiatan organisasi komisi anggaran program evaluasi").split()
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 25))).capitalize() + "."
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+def make_documents(rng: random.Random) -> dict[str, str]:
+    """Membuat beberapa bentuk dokumen sintetis yang umum muncul dari hasil ekstraksi."""
+    return {
+        # Skripsi biasa: banyak paragraf pendek-sedang
+        "paragraf_normal": "\n\n".join(_paragraph(rng, rng.randint(3, 10)) for _ in range(3000)),
+        # PDF hasil fitz tanpa baris kosong: satu paragraf raksasa
+        "paragraf_raksasa": "\n".join(_paragraph(rng, 5) for _ in range(3000)),
+        # Teks tanpa tanda baca sama sekali: memaksa pemecahan per kata
+        "tanpa_kalimat": " ".join(rng.choice(WORDS) for _ in range(300000)),
+    }
+
+def legacy_split(text: str, max_chunk_size: int = 7000) -> list:
+    """Implementasi lama berbasis karakter (penggabungan string berulang) sebagai pembanding."""
+    chunks, current_chunk = [], ""
+    for paragraph in text.split('\n\n'):
+        if len(current_chunk) + len(paragraph) + 2 <= max_chunk_size:
+            current_chunk += paragraph + "\n\n"
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = paragraph + "\n\n"
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+def _timed(func, *args, repeat: int = 3) -> tuple[float, list]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    rng = random.Random(42)
+    print(f"Anggaran chunk: {MAX_CHUNK_TOKENS} token\n")
+    print(f"{'dokumen':<18} {'MB':>6} {'impl':<7} {'detik':>8} {'MB/s':>8} {'chunk':>6} {'token maks':>10}")
+    for name, text in make_documents(rng).items():
+        size_mb = len(text.encode("utf-8")) / 1e6
+        for label, func in (("lama", legacy_split), ("token", split_text_into_logical_chunks)):
+            elapsed, chunks = _timed(func, text)
+            max_tokens = max(estimate_tokens(chunk) for chunk in chunks)
+            print(f"{name:<18} {size_mb:>6.2f} {label:<7} {elapsed:>8.4f} {size_mb / elapsed:>8.1f} "
+                  f"{len(chunks):>6} {max_tokens:>10}")
+
+if __name__ == "__main__":
+    main()
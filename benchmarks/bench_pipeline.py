@@ -0,0 +1,126 @@
+# benchmarks/bench_pipeline.py
+"""Benchmark end-to-end pipeline dokumen (ekstraksi → chunk → LLM → ejaan → diff) secara offline.
+
+LLM diganti stub lokal (benchmarks/stub_server.py) sehingga tidak memakai kuota Groq.
+Jalankan dari direktori utama proyek:  python -m benchmarks.bench_pipeline --docs 6 --pages 30 --concurrency 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Konfigurasi dibaca saat import, jadi lingkungan benchmark harus disiapkan lebih dulu
+os.environ.setdefault("TELEGRAM_TOKEN", "0:benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("ADMIN_ID", "0")
+os.environ.setdefault("CHUNK_CACHE_ENABLED", "0")
+
+WORDS = ("penelitian analisis data sistem informasi taruna pendidikan metode hasil pembahasan kesimpulan "
+         "laporan kegiatan organisasi komisi anggaran program evaluasi penelitan sistim anggaram").split()
+
+def _paragraph(rng: random.Random) -> str:
+    sentences = (" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                 for _ in range(rng.randint(3, 7)))
+    return " ".join(sentences)
+
+def build_corpus(directory: str, docs: int, pages: int, seed: int = 7) -> list[str]:
+    """Membuat dokumen sintetis .txt/.pdf/.docx bergantian, masing-masing kira-kira `pages` halaman."""
+    import docx
+    import fitz
+
+    rng = random.Random(seed)
+    paths = []
+    for i in range(docs):
+        page_texts = ["\n\n".join(_paragraph(rng) for _ in range(4)) for _ in range(pages)]
+        ext = (".txt", ".pdf", ".docx")[i % 3]
+        path = os.path.join(directory, f"dokumen_{i}{ext}")
+        if ext == ".txt":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(page_texts))
+        elif ext == ".pdf":
+            with fitz.open() as pdf:
+                for text in page_texts:
+                    pdf.new_page().insert_textbox(fitz.Rect(50, 50, 545, 792), text, fontsize=9)
+                pdf.save(path)
+        else:
+            document = docx.Document()
+            for text in page_texts:
+                for paragraph in text.split("\n\n"):
+                    document.add_paragraph(paragraph)
+            document.save(path)
+        paths.append(path)
+    return paths
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run_benchmark(paths: list[str], concurrency: int, mode: str) -> tuple[list[dict], int, float]:
+    from pipeline import process_document
+    from ai_service import close_http_client
+    from utils import ExtractionError
+
+    slots = asyncio.Semaphore(concurrency)
+    timings: list[dict] = []
+    failures = 0
+
+    async def run_one(path: str):
+        nonlocal failures
+        async with slots:
+            try:
+                result = await process_document(path, mode)
+                timings.append(result.timings)
+            except ExtractionError as e:
+                failures += 1
+                print(f"Gagal memproses {os.path.basename(path)}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_one(path) for path in paths))
+    elapsed = time.perf_counter() - started
+    await close_http_client()
+    return timings, failures, elapsed
+
+def print_report(timings: list[dict], failures: int, elapsed: float):
+    print(f"\nDokumen selesai: {len(timings)} | gagal: {failures} | waktu total: {elapsed:.2f} dtk | "
+          f"throughput: {len(timings) / elapsed * 60:.1f} dokumen/menit\n")
+    print(f"{'tahap':<12} {'p50':>8} {'p90':>8} {'p99':>8} {'maks':>8}  (detik)")
+    for stage in ("extract", "llm", "spell_check", "diff", "total"):
+        values = [t[stage] for t in timings if stage in t]
+        if values:
+            print(f"{stage:<12} {statistics.median(values):>8.3f} {_percentile(values, 90):>8.3f} "
+                  f"{_percentile(values, 99):>8.3f} {max(values):>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end pipeline dokumen dengan stub LLM.")
+    parser.add_argument("--docs", type=int, default=6)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--mode", choices=("DMT", "Umum"), default="Umum")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", choices=("json", "fenced", "mixed"), default="mixed")
+    parser.add_argument("--base-url", help="Pakai stub/endpoint yang sudah berjalan alih-alih stub bawaan")
+    args = parser.parse_args()
+
+    if args.base_url:
+        os.environ["GROQ_BASE_URL"] = args.base_url
+    else:
+        from benchmarks.stub_server import StubOptions, start_stub_server
+        server = start_stub_server(options=StubOptions(args.latency, args.jitter, args.error_rate, args.output, seed=1))
+        os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    from workers import shutdown_workers
+    with tempfile.TemporaryDirectory(prefix="insightdoc-bench-") as directory:
+        paths = build_corpus(directory, args.docs, args.pages)
+        try:
+            timings, failures, elapsed = asyncio.run(run_benchmark(paths, args.concurrency, args.mode))
+        finally:
+            shutdown_workers()
+    print_report(timings, failures, elapsed)
+
+if __name__ == "__main__":
+    main()
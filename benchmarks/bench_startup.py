@@ -0,0 +1,126 @@
+# benchmarks/bench_startup.py
+"""Benchmark waktu start bot: dari proses dijalankan hingga update pertama selesai ditangani.
+
+Bot dijalankan sebagai subprocess (`python main.py`) yang diarahkan ke server Bot API tiruan lokal.
+Server mengirim satu update `/start`, lalu mencatat kapan balasan `sendMessage` pertama tiba.
+Jalankan dari direktori utama proyek:  python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_USER = {"id": 10, "is_bot": False, "first_name": "Benchmark"}
+_CHAT = {"id": 10, "type": "private"}
+
+class _FakeTelegramHandler(BaseHTTPRequestHandler):
+    state: dict
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_result(self, result):
+        payload = json.dumps({"ok": True, "result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Bot dihentikan saat long polling masih berlangsung
+
+    def do_GET(self):
+        # Permintaan pemanasan klien Groq (GET /v1/models) juga diarahkan ke sini
+        self._send_result([])
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        if method == "getMe":
+            self._send_result({"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"})
+        elif method == "getUpdates":
+            with self.state["lock"]:
+                first = not self.state["delivered"]
+                self.state["delivered"] = True
+            if first:
+                message = {"message_id": 1, "date": int(time.time()), "chat": _CHAT, "from": _USER, "text": "/start",
+                           "entities": [{"type": "bot_command", "offset": 0, "length": 6}]}
+                self._send_result([{"update_id": 1, "message": message}])
+            else:
+                time.sleep(0.5)  # Meniru long polling tanpa update baru
+                self._send_result([])
+        elif method == "sendMessage":
+            self.state["replied_at"] = time.perf_counter()
+            self.state["replied"].set()
+            self._send_result({"message_id": 2, "date": int(time.time()), "chat": _CHAT, "text": "ok"})
+        else:
+            self._send_result(True)
+
+def _start_fake_telegram() -> tuple[ThreadingHTTPServer, dict]:
+    state = {"lock": threading.Lock(), "delivered": False, "replied": threading.Event(), "replied_at": None}
+    handler = type("FakeTelegramHandler", (_FakeTelegramHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def measure_first_update(warm_up: bool, timeout: float = 60) -> float:
+    """Menjalankan bot sekali dan mengembalikan detik dari start proses hingga balasan update pertama."""
+    server, state = _start_fake_telegram()
+    base = f"http://127.0.0.1:{server.server_port}"
+    env = dict(os.environ, TELEGRAM_TOKEN="1:benchmark", GROQ_API_KEY="benchmark", ADMIN_ID="0",
+               TELEGRAM_BASE_URL=f"{base}/bot", GROQ_BASE_URL=f"{base}/v1", METRICS_PORT="0",
+               RUN_MODE="single", WARM_UP_ON_START="1" if warm_up else "0")
+    with tempfile.TemporaryDirectory(prefix="insightdoc-startup-") as directory:
+        # Direktori kerja sementara agar berkas database bot tidak tercampur dengan data asli
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py")], cwd=directory, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not state["replied"].wait(timeout):
+                raise RuntimeError("Bot tidak membalas update pertama dalam batas waktu.")
+            return state["replied_at"] - started
+        finally:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            server.shutdown()
+
+def measure_import() -> float:
+    """Mengukur waktu import bot_handlers di proses baru (tanpa kredensial di environment)."""
+    code = "import time; t = time.perf_counter(); import bot_handlers; print(time.perf_counter() - t)"
+    env = {k: v for k, v in os.environ.items() if k not in ("TELEGRAM_TOKEN", "GROQ_API_KEY", "ADMIN_ID")}
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def _summary(name: str, values: list[float]):
+    print(f"{name:<28} {statistics.median(values):8.3f} {min(values):8.3f} {max(values):8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu start bot hingga update pertama ditangani.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    without_warm_up = [measure_first_update(warm_up=False) for _ in range(args.runs)]
+    with_warm_up = [measure_first_update(warm_up=True) for _ in range(args.runs)]
+
+    print(f"\n{'pengukuran':<28} {'p50':>8} {'min':>8} {'maks':>8}  (detik, {args.runs} kali)")
+    _summary("import bot_handlers", imports)
+    _summary("update pertama", without_warm_up)
+    _summary("update pertama + pemanasan", with_warm_up)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/stub_server.py
+"""Server tiruan lokal yang meniru endpoint chat-completions Groq/OpenAI untuk uji beban tanpa kuota.
+
+Jalankan:  python -m benchmarks.stub_server --port 8099 --latency 0.8 --jitter 0.3 --error-rate 0.02
+Lalu arahkan bot ke stub:  GROQ_BASE_URL=http://127.0.0.1:8099/v1 python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+@dataclass
+class StubOptions:
+    latency: float = 0.5      # detik, rata-rata waktu respons
+    jitter: float = 0.0       # detik, variasi acak ± di sekitar latensi
+    error_rate: float = 0.0   # peluang respons error (429/500/503)
+    output: str = "mixed"     # 'json', 'fenced' (```json ... ```), atau 'mixed'
+    seed: int | None = None
+
+class _StubHandler(BaseHTTPRequestHandler):
+    options: StubOptions
+    rng: random.Random
+    rng_lock: threading.Lock
+
+    def log_message(self, format, *args):
+        pass  # Senyap agar output benchmark tetap bersih
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.rng_lock:
+            delay = max(0.0, self.options.latency + self.rng.uniform(-self.options.jitter, self.options.jitter))
+            failed = self.rng.random() < self.options.error_rate
+            status = self.rng.choice((429, 500, 503))
+            fenced = self.options.output == "fenced" or (self.options.output == "mixed" and self.rng.random() < 0.5)
+        time.sleep(delay)
+        if failed:
+            self._send_json(status, {"error": {"message": "stub error"}},
+                            headers={"Retry-After": "1"} if status == 429 else None)
+            return
+        content = self._completion_content(request, fenced)
+        if request.get("stream"):
+            self._send_stream(content, request.get("model", "stub"))
+            return
+        self._send_json(200, {
+            "id": "stub-completion", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _send_stream(self, content: str, model: str):
+        """Mengirim jawaban sebagai Server-Sent Events per kata, seperti mode `stream: true` OpenAI."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            event = {"id": "stub-completion", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(0.01)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    @staticmethod
+    def _completion_content(request: dict, fenced: bool) -> str:
+        user_messages = [m["content"] for m in request.get("messages", []) if m.get("role") == "user"]
+        if not user_messages:
+            # Permintaan analisis judul: cukup balas teks Markdown
+            return "**Analisis (stub)**\n\n- Judul sudah cukup jelas.\n- Saran: persempit fokus penelitian."
+        body = json.dumps({"klasifikasi": "Laporan", "koreksi_teks": user_messages[-1]}, ensure_ascii=False)
+        return f"Berikut hasilnya:\n```json\n{body}\n```" if fenced else body
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0,
+                      options: StubOptions | None = None) -> ThreadingHTTPServer:
+    """Menjalankan stub di thread latar belakang; port 0 berarti dipilih otomatis (lihat server.server_port)."""
+    options = options or StubOptions()
+    handler = type("StubHandler", (_StubHandler,), {
+        "options": options, "rng": random.Random(options.seed), "rng_lock": threading.Lock()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="groq-stub", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub lokal endpoint chat-completions Groq.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", choices=("json", "fenced", "mixed"), default="mixed")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    server = start_stub_server(args.host, args.port, StubOptions(
+        args.latency, args.jitter, args.error_rate, args.output, args.seed))
+    print(f"Stub Groq aktif di http://{args.host}:{server.server_port}/v1 (Ctrl+C untuk berhenti)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,36 @@
 # bot_handlers.py
+import io
 import os
+import shutil
 import logging
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
-from telegram.ext import ContextTypes
+import tempfile
+from telegram import Bot, Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.ext import Application, ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import TelegramError
 
-from config import ADMIN_ID, MAX_CHUNK_SIZE
-from utils import extract_text, split_text_into_logical_chunks, generate_diff_report, final_spell_check
-from ai_service import correct_and_classify_text, analyze_title_with_llm
-from user_manager import load_user_data, track_user
+import config
+from config import USERS_PAGE_SIZE, DOWNLOAD_SPILL_THRESHOLD_MB, RUN_MODE, METRICS_PUBLISH_INTERVAL
+from utils import ExtractionError, UNSUPPORTED_FORMAT_MESSAGE
+from ai_service import analyze_title_with_llm, analyze_title_for_dmt
+from pipeline import process_document
+from scheduler import get_scheduler
+from job_store import JobCheckpoint, get_job_store
+from task_queue import get_task_queue
+from progress import ThrottledEditor
+import metrics
+from user_manager import track_user, count_users, get_users_page
 
 logger = logging.getLogger(__name__)
 
+# Pekerjaan dokumen yang sedang berjalan di proses ini; unggahan ulang tidak boleh menjalankannya dua kali
+_active_jobs: set[str] = set()
+
+STAGE_MESSAGES = {
+    "spell_check": "🔬 Melakukan pemindaian ejaan final...",
+    "diff": "📝 Menyusun laporan perubahan...",
+}
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user.first_name
     keyboard = [
@@ -64,76 +83,212 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     track_user(update.effective_user, mode)
     doc = update.message.document
-    file_path = f"download_{doc.file_name}"
-    processing_message = await update.message.reply_text(f"✅ Dokumen `{doc.file_name}` diterima...", parse_mode=ParseMode.MARKDOWN)
+    if not doc.file_name:
+        # Tanpa nama berkas format dokumen tidak dapat ditentukan (dan nama wajib disimpan di job store)
+        await update.message.reply_text(UNSUPPORTED_FORMAT_MESSAGE)
+        return
+    store = get_job_store()
+    job_id = store.make_job_id(update.effective_user.id, mode, doc.file_unique_id)
+    if RUN_MODE != 'split':
+        # Mode split memakai dedupe_key antrean; di sini pekerjaan yang sedang berjalan dicatat di memori
+        if job_id in _active_jobs:
+            await update.message.reply_text("⏳ Dokumen ini masih diproses. Hasilnya akan dikirim setelah selesai.")
+            return
+        _active_jobs.add(job_id)
     try:
-        file_data = await context.bot.get_file(doc.file_id)
-        await file_data.download_to_drive(file_path)
-        original_text, error = extract_text(file_path)
-        if error:
-            await processing_message.edit_text(error)
+        processing_message = await update.message.reply_text(f"✅ Dokumen `{doc.file_name}` diterima...",
+                                                             parse_mode=ParseMode.MARKDOWN)
+        resumed = store.start_job(job_id, update.effective_user.id, update.effective_chat.id,
+                                  processing_message.message_id, doc.file_id, doc.file_name, mode)
+        if resumed:
+            await processing_message.edit_text("♻️ Melanjutkan pemrosesan dokumen ini dari bagian terakhir yang selesai...")
+        if RUN_MODE == 'split':
+            queue = get_task_queue()
+            if queue.enqueue("document", {"job_id": job_id, "file_size": doc.file_size or 0}, dedupe_key=job_id) is None:
+                await processing_message.edit_text("⏳ Dokumen ini sudah ada di antrean pemrosesan.")
+            else:
+                await processing_message.edit_text(
+                    f"⏳ Dokumen masuk antrean pemrosesan ({queue.pending_count()} tugas dalam antrean).")
             return
-        
-        chunks = split_text_into_logical_chunks(original_text, MAX_CHUNK_SIZE)
-        corrected = []
-        classification = "Tidak Diketahui"
-        for i, chunk in enumerate(chunks):
-            await processing_message.edit_text(f"🧠 Menganalisis dengan AI... Bagian {i + 1}/{len(chunks)}.")
-            result = correct_and_classify_text(chunk, i == 0, mode)
-            if "error" in result:
-                corrected.append(chunk) # Fallback ke teks asli jika ada error
+        await run_document_job(context.bot, store.get_job(job_id), file_size=doc.file_size or 0)
+    finally:
+        _active_jobs.discard(job_id)
+
+async def run_document_job(bot: Bot, job: dict, file_size: int = 0):
+    """Memproses satu pekerjaan dokumen dari job store dan mengirim hasilnya ke obrolan pengguna."""
+    mode, chat_id, file_name = job['mode'], job['chat_id'], job['file_name']
+    store = get_job_store()
+    temp_dir = None
+    _active_jobs.add(job['job_id'])
+
+    async def edit(text: str, **kwargs):
+        await bot.edit_message_text(text, chat_id=chat_id, message_id=job['message_id'], **kwargs)
+
+    editor = ThrottledEditor(edit)
+
+    try:
+        with metrics.stage_timer("download", mode):
+            file_data = await bot.get_file(job['file_id'])
+            file_size = file_size or file_data.file_size or 0
+            if file_size > DOWNLOAD_SPILL_THRESHOLD_MB * 1024 * 1024:
+                # Direktori per pekerjaan: unggahan bernama sama dari pengguna lain tidak saling menimpa
+                temp_dir = tempfile.mkdtemp(prefix="insightdoc_")
+                source = str(await file_data.download_to_drive(os.path.join(temp_dir, os.path.basename(file_name))))
             else:
-                corrected.append(result.get("koreksi_teks", chunk))
-                if i == 0: classification = result.get("klasifikasi", "Tidak Diketahui")
-        
-        ai_corrected_text = "".join(corrected)
-        await processing_message.edit_text("🔬 Melakukan pemindaian ejaan final...")
-        final_text = final_spell_check(ai_corrected_text)
-        
-        diff_report = generate_diff_report(original_text, final_text)
-        await update.message.reply_text(diff_report, parse_mode=ParseMode.MARKDOWN)
+                source = bytes(await file_data.download_as_bytearray())
+        metrics.inc("document_bytes", mode, file_size or len(source))
+
+        progress = {"stage": None, "done": 0, "total": None, "queue": None}
+
+        def progress_text() -> str:
+            text = f"🧠 Menganalisis dengan AI... {progress['done']}/{progress['total'] or '?'} bagian selesai."
+            if progress["queue"]:
+                text += f"\n⏳ Antrean: {progress['queue']} pengguna lain dilayani lebih dulu."
+            return text
+
+        async def report_stage(stage: str):
+            progress["stage"] = stage
+            await editor.update(progress_text() if stage == "llm" else STAGE_MESSAGES[stage])
+
+        async def report_progress(done: int, total: int | None):
+            progress.update(done=done, total=total)
+            if progress["stage"] == "llm":
+                await editor.update(progress_text())
+
+        async def report_queue(position: int):
+            progress["queue"] = position
+            if progress["stage"] == "llm":
+                await editor.update(progress_text())
+
+        unsubscribe = get_scheduler().subscribe(job['user_id'], report_queue)
+        try:
+            result = await process_document(source, mode, on_progress=report_progress, on_stage=report_stage,
+                                            user_key=job['user_id'], checkpoint=JobCheckpoint(store, job['job_id']),
+                                            file_name=file_name)
+        except ExtractionError as e:
+            store.set_status(job['job_id'], "failed")
+            await editor.finish(str(e))
+            return
+        finally:
+            unsubscribe()
+        await bot.send_message(chat_id, result.diff_report.message, parse_mode=ParseMode.MARKDOWN)
+        if result.diff_report.message_truncated:
+            report_file = io.BytesIO(result.diff_report.full_report.encode("utf-8"))
+            with metrics.stage_timer("upload", mode):
+                await bot.send_document(chat_id=chat_id, document=report_file,
+                                        filename=f"laporan_perubahan_{os.path.splitext(file_name)[0]}.txt",
+                                        caption="📝 Laporan perubahan lengkap.")
         
         result_message = (f"🎉 *Analisis Selesai!*\n\n"
-                        f"📎 *File Asli:* `{doc.file_name}`\n"
-                        f"🏷️ *Klasifikasi ({mode}):* *{classification}*")
-        await processing_message.edit_text(result_message, parse_mode=ParseMode.MARKDOWN)
+                        f"📎 *File Asli:* `{file_name}`\n"
+                        f"🏷️ *Klasifikasi ({mode}):* *{result.classification}*")
+        await editor.finish(result_message, parse_mode=ParseMode.MARKDOWN)
         
-        corrected_filename = f"corrected_{os.path.splitext(doc.file_name)[0]}.txt"
-        with open(corrected_filename, "w", encoding="utf-8") as f:
-            f.write(final_text)
-        with open(corrected_filename, "rb") as f:
-            await context.bot.send_document(chat_id=update.effective_chat.id, document=f,
-                                            filename=corrected_filename, caption="📄 Dokumen versi final.")
-        os.remove(corrected_filename)
+        corrected_filename = f"corrected_{os.path.splitext(file_name)[0]}.txt"
+        with metrics.stage_timer("upload", mode):
+            await bot.send_document(chat_id=chat_id, document=io.BytesIO(result.final_text.encode("utf-8")),
+                                    filename=corrected_filename, caption="📄 Dokumen versi final.")
+        store.set_status(job['job_id'], "done")
     except Exception as e:
         logger.error(f"❌ Error di handle_document: {e}")
-        await processing_message.edit_text(f"❌ Terjadi kesalahan tak terduga: {e}")
+        store.set_status(job['job_id'], "failed")
+        await editor.finish(f"❌ Terjadi kesalahan tak terduga: {e}\nKirim ulang dokumen yang sama untuk melanjutkan dari bagian terakhir.")
     finally:
-        if os.path.exists(file_path): os.remove(file_path)
+        _active_jobs.discard(job['job_id'])
+        if temp_dir: shutil.rmtree(temp_dir, ignore_errors=True)
+
+async def resume_unfinished_jobs(application: Application):
+    """Melanjutkan pekerjaan dokumen yang terputus karena bot berhenti atau restart."""
+    bot = application.bot
+    jobs = get_job_store().unfinished_jobs()
+    if jobs:
+        logger.info(f"♻️ Melanjutkan {len(jobs)} pekerjaan dokumen yang terputus.")
+    if RUN_MODE == 'split':
+        # Pekerjaan yang masih ada di antrean diabaikan (dedupe); sisanya diambil kembali oleh proses pekerja
+        for job in jobs:
+            get_task_queue().enqueue("document", {"job_id": job['job_id']}, dedupe_key=job['job_id'])
+        return
+    for job in jobs:
+        try:
+            message = await bot.send_message(job['chat_id'], f"♻️ Bot dimulai ulang. Melanjutkan pemrosesan `{job['file_name']}`...",
+                                             parse_mode=ParseMode.MARKDOWN)
+        except TelegramError as e:
+            logger.error(f"Gagal menghubungi obrolan {job['chat_id']} untuk melanjutkan pekerjaan: {e}")
+            get_job_store().set_status(job['job_id'], "failed")
+            continue
+        job['message_id'] = message.message_id
+        application.create_task(run_document_job(bot, job))
 
 async def check_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         await update.message.reply_text("Gunakan format: `/checktitle [judul penelitian Anda]`", parse_mode=ParseMode.MARKDOWN)
         return
     title = " ".join(context.args)
+    mode = context.user_data.get('mode', 'Umum')
     processing_message = await update.message.reply_text("🧠 Menganalisis judul dengan AI...")
-    feedback = analyze_title_with_llm(title)
-    await processing_message.edit_text(feedback, parse_mode=ParseMode.MARKDOWN)
+    task = {"chat_id": update.effective_chat.id, "message_id": processing_message.message_id,
+            "title": title, "mode": mode, "user_id": update.effective_user.id}
+    if RUN_MODE == 'split':
+        get_task_queue().enqueue("title", task)
+        return
+    await run_title_job(context.bot, **task)
+
+async def run_title_job(bot: Bot, chat_id: int, message_id: int, title: str, mode: str, user_id: int):
+    """Menganalisis judul dan menampilkan jawabannya secara bertahap pada pesan `message_id`."""
+    analyze = analyze_title_for_dmt if mode == 'DMT' else analyze_title_with_llm
+
+    async def edit(text: str, **kwargs):
+        await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, **kwargs)
+
+    editor = ThrottledEditor(edit)
+    with metrics.stage_timer("title", mode):
+        # Teks parsial dikirim tanpa Markdown karena formatnya belum tentu lengkap
+        feedback = await analyze(title, user_key=user_id, on_partial=editor.update)
+    await editor.finish(feedback, parse_mode=ParseMode.MARKDOWN)
 
 async def show_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != ADMIN_ID:
+    if update.effective_user.id != config.ADMIN_ID:
         await update.message.reply_text("⛔ Anda tidak diizinkan menggunakan perintah ini.")
         return
-    users = load_user_data()
-    if not users:
+    try:
+        page = max(int(context.args[0]), 1) if context.args else 1
+    except ValueError:
+        page = 1
+    total = count_users()
+    if not total:
         await update.message.reply_text("Belum ada data pengguna.")
         return
-    message = "👥 *Daftar Pengguna Bot*\n\n"
-    for uid, data in users.items():
+    pages = (total + USERS_PAGE_SIZE - 1) // USERS_PAGE_SIZE
+    page = min(page, pages)
+    message = f"👥 *Daftar Pengguna Bot* (halaman {page}/{pages}, total {total})\n\n"
+    for data in get_users_page(page, USERS_PAGE_SIZE):
         username = f"(@{data['username']})" if data['username'] != 'N/A' else ""
         message += (f"👤 *{data['first_name']}* {username}\n"
-                    f"  - ID: `{uid}` | Penggunaan: {data['usage_count']}x\n"
+                    f"  - ID: `{data['user_id']}` | Penggunaan: {data['usage_count']}x\n"
                     f"  - Terakhir Aktif: {data['last_used']}\n\n")
+    if page < pages:
+        message += f"_Gunakan_ `/users {page + 1}` _untuk halaman berikutnya._"
+    await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+
+async def show_metrics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != config.ADMIN_ID:
+        await update.message.reply_text("⛔ Anda tidak diizinkan menggunakan perintah ini.")
+        return
+    stages = metrics.summary()
+    if not stages:
+        await update.message.reply_text("Belum ada metrik yang tercatat.")
+        return
+    message = "📈 *Metrik Pemrosesan*\n\n"
+    for item in stages:
+        errors = f" | ❗{item['errors']} error" if item['errors'] else ""
+        message += f"• `{item['stage']}` ({item['mode']}): {item['count']}x, rata-rata {item['avg']:.2f} dtk{errors}\n"
+    totals = metrics.counter_totals()
+    if totals:
+        message += "\n"
+        for (name, mode), value in sorted(totals.items()):
+            message += f"• `{name}` ({mode}): {value:g}\n"
+    if RUN_MODE == 'split':
+        message += f"\n_Termasuk metrik proses pekerja (diperbarui tiap {METRICS_PUBLISH_INTERVAL:g} detik)._"
     await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
 
 async def unknown_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
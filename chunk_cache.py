@@ -0,0 +1,96 @@
+# chunk_cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from config import CHUNK_CACHE_FILE, CHUNK_CACHE_MAX_MB, CHUNK_CACHE_MAX_AGE_DAYS
+from storage import connect
+
+logger = logging.getLogger(__name__)
+
+# Eviksi berdasarkan ukuran hanya dijalankan setiap sekian kali penulisan agar put() tetap murah
+_EVICT_EVERY_N_PUTS = 100
+
+class ChunkCache:
+    """Cache persisten (SQLite) untuk hasil koreksi dan klasifikasi per chunk."""
+
+    def __init__(self, path: str, max_bytes: int, max_age_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunk_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_cache_access ON chunk_cache(last_access)")
+        self.evict()
+
+    @staticmethod
+    def make_key(text: str, mode: str, is_first_chunk: bool, model: str, prompt_version: str) -> str:
+        """Membuat kunci cache dari hash isi chunk beserta seluruh parameter yang memengaruhi hasil."""
+        h = hashlib.sha256()
+        for part in (prompt_version, model, mode, "1" if is_first_chunk else "0"):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        """Mengambil hasil tersimpan; hit/miss dicatat pemanggil lewat modul metrics."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM chunk_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row["created_at"] > self.max_age_seconds:
+                return None
+            self._conn.execute("UPDATE chunk_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row["value"])
+
+    def put(self, key: str, value: dict):
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_cache (key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)", (key, payload, len(payload), now, now))
+            self._puts += 1
+            evict_now = self._puts % _EVICT_EVERY_N_PUTS == 0
+        if evict_now:
+            self.evict()
+
+    def evict(self):
+        """Menghapus entri kedaluwarsa, lalu entri yang paling lama tidak dipakai jika melebihi batas ukuran."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_cache WHERE created_at < ?",
+                               (time.time() - self.max_age_seconds,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunk_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            freed = 0
+            stale_keys = []
+            for row in self._conn.execute("SELECT key, size FROM chunk_cache ORDER BY last_access"):
+                stale_keys.append((row["key"],))
+                freed += row["size"]
+                if freed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM chunk_cache WHERE key = ?", stale_keys)
+        logger.info(f"Cache chunk: {len(stale_keys)} entri dihapus untuk membebaskan {freed} byte.")
+
+_chunk_cache: ChunkCache | None = None
+
+def get_chunk_cache() -> ChunkCache:
+    """Mengembalikan instance cache chunk bersama (dibuka saat pertama kali dipakai)."""
+    global _chunk_cache
+    if _chunk_cache is None:
+        _chunk_cache = ChunkCache(CHUNK_CACHE_FILE, CHUNK_CACHE_MAX_MB * 1024 * 1024,
+                                  CHUNK_CACHE_MAX_AGE_DAYS * 86400)
+    return _chunk_cache
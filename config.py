@@ -2,27 +2,144 @@
 import os
 from dotenv import load_dotenv
 
-# Muat variabel dari file .env
+# Muat variabel dari file .env (murah; nilai yang sudah ada di environment tidak ditimpa)
 load_dotenv()
 
 # --- TOKENS & KEYS ---
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+# TELEGRAM_TOKEN, GROQ_API_KEY, dan ADMIN_ID divalidasi saat pertama kali dibaca (lihat __getattr__),
+# sehingga modul lain dapat diimpor tanpa kredensial, misalnya oleh benchmark atau pengujian.
+def _load_secret(name: str):
+    if name in ('TELEGRAM_TOKEN', 'GROQ_API_KEY'):
+        value = os.getenv(name)
+        if not value:
+            raise EnvironmentError("PENTING: Harap atur TELEGRAM_TOKEN dan GROQ_API_KEY dalam file .env.")
+        return value
+    try:
+        return int(os.getenv('ADMIN_ID'))
+    except (TypeError, ValueError):
+        raise EnvironmentError("PENTING: Harap atur ADMIN_ID dalam file .env dengan nilai integer yang valid.") from None
 
-if not TELEGRAM_TOKEN or not GROQ_API_KEY:
-    raise EnvironmentError("PENTING: Harap atur TELEGRAM_TOKEN dan GROQ_API_KEY dalam file .env.")
+def __getattr__(name: str):
+    if name in ('TELEGRAM_TOKEN', 'GROQ_API_KEY', 'ADMIN_ID'):
+        value = globals()[name] = _load_secret(name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def validate():
+    """Memastikan seluruh kredensial wajib tersedia; dipanggil saat bot dimulai agar salah konfigurasi langsung terlihat."""
+    for name in ('TELEGRAM_TOKEN', 'GROQ_API_KEY', 'ADMIN_ID'):
+        __getattr__(name)
 
 # --- BOT & AI SETTINGS ---
 GROQ_MODEL = "llama3-8b-8192"
-try:
-    ADMIN_ID = int(os.getenv('ADMIN_ID'))
-except (TypeError, ValueError):
-    raise EnvironmentError("PENTING: Harap atur ADMIN_ID dalam file .env dengan nilai integer yang valid.")
 
-# Ukuran chunk optimal untuk dianalisis oleh AI
-MAX_CHUNK_SIZE = 7000
+# Ukuran chunk dihitung dalam perkiraan token (bukan karakter) agar tidak melebihi konteks model
+MODEL_CONTEXT_TOKENS = {"llama3-8b-8192": 8192, "llama3-70b-8192": 8192, "llama-3.1-8b-instant": 131072}
+DEFAULT_CONTEXT_TOKENS = 8192
+# Batas atas token per chunk meskipun konteks model masih cukup (menjaga latensi per panggilan)
+MAX_CHUNK_TOKENS = int(os.getenv('MAX_CHUNK_TOKENS', 2000))
+# Rata-rata karakter per token untuk teks bahasa Indonesia (perkiraan konservatif)
+CHARS_PER_TOKEN = float(os.getenv('CHARS_PER_TOKEN', 3.5))
+# Output koreksi berisi ulang seluruh teks dalam JSON, sehingga butuh ruang sedikit lebih besar dari input
+CHUNK_OUTPUT_TOKEN_RATIO = 1.2
+CHUNK_SAFETY_MARGIN_TOKENS = 256
+
+# Pemeriksa ejaan final: bahasa kamus dan kapasitas cache koreksi kata (LRU)
+SPELL_LANGUAGE = os.getenv('SPELL_LANGUAGE', 'id')
+SPELL_CORRECTION_CACHE_SIZE = int(os.getenv('SPELL_CORRECTION_CACHE_SIZE', 50000))
+
+# Laporan perubahan (diff per chunk, tingkat kata): batas contoh di pesan dan batas perubahan di berkas laporan
+DIFF_MESSAGE_MAX_CHARS = int(os.getenv('DIFF_MESSAGE_MAX_CHARS', 3000))
+DIFF_FILE_MAX_CHANGES = int(os.getenv('DIFF_FILE_MAX_CHANGES', 20000))
+# Jumlah kata konteks di kiri dan kanan setiap perubahan
+DIFF_CONTEXT_WORDS = int(os.getenv('DIFF_CONTEXT_WORDS', 3))
+
+# --- HTTP CLIENT (GROQ) ---
+# Endpoint kompatibel OpenAI; bisa diarahkan ke stub lokal (benchmarks/stub_server.py) untuk uji beban
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', "https://api.groq.com/openai/v1")
+# Klien HTTP asinkron bersama dengan connection pooling (keep-alive)
+GROQ_POOL_SIZE = int(os.getenv('GROQ_POOL_SIZE', 20))
+GROQ_KEEPALIVE_CONNECTIONS = int(os.getenv('GROQ_KEEPALIVE_CONNECTIONS', 10))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv('GROQ_KEEPALIVE_EXPIRY', 30))
+GROQ_CONNECT_TIMEOUT = float(os.getenv('GROQ_CONNECT_TIMEOUT', 10))
+GROQ_CORRECTION_TIMEOUT = float(os.getenv('GROQ_CORRECTION_TIMEOUT', 180))
+GROQ_TITLE_TIMEOUT = float(os.getenv('GROQ_TITLE_TIMEOUT', 120))
+
+# Batas kuota Groq yang dijaga penjadwal pusat (token bucket) serta kebijakan retry untuk 429/5xx
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv('GROQ_REQUESTS_PER_MINUTE', 30))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv('GROQ_TOKENS_PER_MINUTE', 30000))
+GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', 4))
+GROQ_RETRY_BASE_DELAY = float(os.getenv('GROQ_RETRY_BASE_DELAY', 1.0))
+GROQ_RETRY_MAX_DELAY = float(os.getenv('GROQ_RETRY_MAX_DELAY', 60))
+# Perkiraan panjang jawaban analisis judul, untuk perhitungan kuota token
+TITLE_OUTPUT_TOKENS = 800
+# Cache analisis judul (judul dinormalisasi) di memori
+TITLE_CACHE_SIZE = int(os.getenv('TITLE_CACHE_SIZE', 1000))
+TITLE_CACHE_TTL_HOURS = float(os.getenv('TITLE_CACHE_TTL_HOURS', 24))
+
+# Batas panggilan LLM paralel: per dokumen dan untuk seluruh bot (dijaga penjadwal)
+MAX_PARALLEL_CHUNKS_PER_DOC = int(os.getenv('MAX_PARALLEL_CHUNKS_PER_DOC', 4))
+MAX_PARALLEL_LLM_CALLS = int(os.getenv('MAX_PARALLEL_LLM_CALLS', 12))
+
+# Pool pekerja untuk tahap berat CPU (ekstraksi, ejaan, diff): 'process' atau 'thread'
+CPU_POOL_KIND = os.getenv('CPU_POOL_KIND', 'process')
+CPU_POOL_WORKERS = int(os.getenv('CPU_POOL_WORKERS', os.cpu_count() or 2))
+# Batas pekerjaan yang boleh mengantre di pool sekaligus; sisanya menunggu di event loop
+CPU_MAX_QUEUED_JOBS = int(os.getenv('CPU_MAX_QUEUED_JOBS', 16))
+
+# Ekstraksi PDF besar: halaman dibagi ke beberapa pekerja per rentang ini
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 25))
+
+# Unggahan diproses langsung dari memori; berkas di atas batas ini ditulis ke direktori sementara per pekerjaan
+# (isi PDF di memori disalin ke setiap pekerja rentang halaman, jadi berkas besar lebih murah dibaca dari disk)
+DOWNLOAD_SPILL_THRESHOLD_MB = float(os.getenv('DOWNLOAD_SPILL_THRESHOLD_MB', 8))
+
+# Endpoint metrik Prometheus lokal; atur METRICS_PORT=0 untuk menonaktifkan
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9464))
+# Mode split: selang proses pekerja menyimpan snapshot metriknya agar digabung oleh proses front
+METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', 10))
+
+# Jeda minimum antar edit pesan progres Telegram (detik) untuk menghindari flood limit
+TELEGRAM_EDIT_INTERVAL = float(os.getenv('TELEGRAM_EDIT_INTERVAL', 1.5))
+
+# Jumlah update Telegram yang boleh diproses bersamaan
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', 32))
+
+# Endpoint Bot API; bisa diarahkan ke server lokal (mis. benchmarks/bench_startup.py)
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL', "https://api.telegram.org/bot")
+# Setelah polling dimulai, muat kamus ejaan/pustaka format dan buka koneksi Groq di latar belakang
+WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', '1') == '1'
+
+# Mode jalan: 'single' (satu proses mengerjakan semuanya) atau 'split' (proses front hanya menerima update
+# dan memasukkan pekerjaan dokumen/judul ke antrean lokal; QUEUE_WORKERS proses pekerja mengerjakannya)
+RUN_MODE = os.getenv('RUN_MODE', 'single')
+QUEUE_DB_FILE = os.getenv('QUEUE_DB_FILE', "task_queue.db")
+QUEUE_WORKERS = int(os.getenv('QUEUE_WORKERS', 2))
+# Tugas yang dikerjakan bersamaan oleh satu proses pekerja (sebagian besar waktunya menunggu LLM)
+QUEUE_TASKS_PER_WORKER = int(os.getenv('QUEUE_TASKS_PER_WORKER', 4))
+# Tugas yang diambil pekerja disembunyikan selama ini; diperpanjang berkala selama masih dikerjakan
+QUEUE_VISIBILITY_TIMEOUT = float(os.getenv('QUEUE_VISIBILITY_TIMEOUT', 120))
+QUEUE_POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', 1.0))
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', 3))
 
 # --- DATA & LABELS ---
-USER_DATA_FILE = "user_data.json"
+USER_DATA_FILE = "user_data.json"  # Format lama; dimigrasikan otomatis ke USER_DB_FILE
+USER_DB_FILE = os.getenv('USER_DB_FILE', "user_data.db")
+USERS_PAGE_SIZE = 20
+
+# Checkpoint pekerjaan dokumen agar dapat dilanjutkan setelah error atau restart
+JOB_DB_FILE = os.getenv('JOB_DB_FILE', "jobs.db")
+JOB_RESUME_MAX_AGE_HOURS = int(os.getenv('JOB_RESUME_MAX_AGE_HOURS', 24))
+# Percobaan koreksi per chunk sebelum kembali memakai teks asli
+MAX_CHUNK_ATTEMPTS = int(os.getenv('MAX_CHUNK_ATTEMPTS', 3))
+CHUNK_RETRY_DELAY = float(os.getenv('CHUNK_RETRY_DELAY', 2.0))
+
+# Cache hasil koreksi per chunk (berbasis hash isi teks)
+CHUNK_CACHE_ENABLED = os.getenv('CHUNK_CACHE_ENABLED', '1') == '1'
+CHUNK_CACHE_FILE = os.getenv('CHUNK_CACHE_FILE', "chunk_cache.db")
+CHUNK_CACHE_MAX_MB = int(os.getenv('CHUNK_CACHE_MAX_MB', 200))
+CHUNK_CACHE_MAX_AGE_DAYS = int(os.getenv('CHUNK_CACHE_MAX_AGE_DAYS', 30))
+
 DMT_LABELS = ["KOMISI I", "KOMISI II", "KOMISI III", "KOMISI IV", "Badan Pengurus Harian"]
 GENERAL_LABELS = ["Surat Resmi", "Laporan", "Artikel", "Pendidikan", "Catatan Pribadi", "Lainnya"]
\ No newline at end of file
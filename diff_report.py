@@ -0,0 +1,128 @@
+# diff_report.py
+import difflib
+from dataclasses import dataclass, field
+
+from config import DIFF_MESSAGE_MAX_CHARS, DIFF_FILE_MAX_CHANGES, DIFF_CONTEXT_WORDS
+
+NO_CHANGES_MESSAGE = "✅ Tidak ada perubahan signifikan yang terdeteksi."
+
+@dataclass
+class ChunkDiffStats:
+    """Statistik perubahan kata untuk satu chunk."""
+    index: int
+    words_total: int
+    words_changed: int
+
+@dataclass
+class DiffReport:
+    """Laporan perubahan dokumen: contoh ringkas untuk pesan dan laporan lengkap untuk dilampirkan sebagai berkas."""
+    message: str
+    full_report: str
+    chunk_stats: list[ChunkDiffStats] = field(default_factory=list)
+    # True jika contoh di pesan tidak memuat seluruh perubahan
+    message_truncated: bool = False
+
+    @property
+    def words_changed(self) -> int:
+        return sum(stats.words_changed for stats in self.chunk_stats)
+
+    @property
+    def chunks_changed(self) -> int:
+        return sum(1 for stats in self.chunk_stats if stats.words_changed)
+
+def _changed_spans(original: list[str], corrected: list[str]):
+    """Menghasilkan rentang kata yang berubah (i1, i2, j1, j2).
+
+    Awalan dan akhiran yang sama dilewati lebih dulu; koreksi biasanya jarang, sehingga
+    SequenceMatcher hanya bekerja pada bagian tengah yang benar-benar berbeda.
+    """
+    prefix = 0
+    limit = min(len(original), len(corrected))
+    while prefix < limit and original[prefix] == corrected[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and original[len(original) - 1 - suffix] == corrected[len(corrected) - 1 - suffix]):
+        suffix += 1
+    middle_a = original[prefix:len(original) - suffix]
+    middle_b = corrected[prefix:len(corrected) - suffix]
+    matcher = difflib.SequenceMatcher(None, middle_a, middle_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            yield prefix + i1, prefix + i2, prefix + j1, prefix + j2
+
+def _render_change(original: list[str], corrected: list[str], i1: int, i2: int, j1: int, j2: int) -> list[str]:
+    """Menampilkan satu perubahan sebagai baris `-`/`+` beserta beberapa kata konteks."""
+    before = original[max(0, i1 - DIFF_CONTEXT_WORDS):i1]
+    after = original[i2:i2 + DIFF_CONTEXT_WORDS]
+    lines = []
+    if i2 > i1:
+        lines.append("- " + " ".join(before + original[i1:i2] + after))
+    if j2 > j1:
+        lines.append("+ " + " ".join(before + corrected[j1:j2] + after))
+    return lines
+
+def build_diff_report(original_chunks: list[str], corrected_chunks: list[str]) -> DiffReport:
+    """Membandingkan dokumen per chunk pada tingkat kata.
+
+    Biaya diff dibatasi ukuran chunk, bukan ukuran dokumen. Penyusunan contoh pesan dan berkas
+    laporan berhenti begitu batasnya terpenuhi; statistik per chunk tetap dihitung untuk semua chunk.
+    """
+    chunk_stats: list[ChunkDiffStats] = []
+    message_lines: list[str] = []
+    message_chars = 0
+    message_full = False
+    file_sections: list[str] = []
+    file_changes = 0
+
+    for index, (original_text, corrected_text) in enumerate(zip(original_chunks, corrected_chunks)):
+        original = original_text.split()
+        if original_text == corrected_text:
+            chunk_stats.append(ChunkDiffStats(index, len(original), 0))
+            continue
+        corrected = corrected_text.split()
+        words_changed = 0
+        section: list[str] = []
+        for i1, i2, j1, j2 in _changed_spans(original, corrected):
+            words_changed += max(i2 - i1, j2 - j1)
+            if file_changes >= DIFF_FILE_MAX_CHANGES:
+                continue
+            file_changes += 1
+            lines = _render_change(original, corrected, i1, i2, j1, j2)
+            section.extend(lines)
+            if not message_full:
+                # Backtick di dalam teks akan menutup blok kode Markdown
+                lines = [line.replace("`", "'") for line in lines]
+                size = sum(len(line) + 1 for line in lines)
+                if message_chars + size > DIFF_MESSAGE_MAX_CHARS:
+                    message_full = True
+                else:
+                    message_lines.extend(lines)
+                    message_chars += size
+        chunk_stats.append(ChunkDiffStats(index, len(original), words_changed))
+        if section:
+            file_sections.append(f"=== Bagian {index + 1}: {words_changed} dari {len(original)} kata diubah ===\n"
+                                 + "\n".join(section))
+
+    report = DiffReport("", "", chunk_stats)
+    if not report.words_changed:
+        report.message = NO_CHANGES_MESSAGE
+        return report
+
+    summary = (f"{report.words_changed} kata diubah di {report.chunks_changed} "
+               f"dari {len(chunk_stats)} bagian dokumen.")
+    report.message_truncated = message_full or file_changes >= DIFF_FILE_MAX_CHANGES
+    message = "📝 *Laporan Perubahan Teks (Contoh):*\n\n```diff\n" + "\n".join(message_lines) + "\n```\n"
+    message += f"📊 {summary}"
+    if report.message_truncated:
+        message += "\n_(Contoh dipotong; laporan lengkap dilampirkan sebagai berkas)_"
+    report.message = message
+
+    header = ["Laporan Perubahan Teks", "", summary, ""]
+    if file_changes >= DIFF_FILE_MAX_CHANGES:
+        header += [f"(Daftar perubahan dipotong setelah {DIFF_FILE_MAX_CHANGES} perubahan; statistik tetap lengkap.)", ""]
+    header += ["Perubahan per bagian:"]
+    header += [f"  Bagian {stats.index + 1}: {stats.words_changed}/{stats.words_total} kata"
+               for stats in chunk_stats if stats.words_changed]
+    report.full_report = "\n".join(header) + "\n\n" + "\n\n".join(file_sections) + "\n"
+    return report
@@ -0,0 +1,166 @@
+# job_store.py
+import hashlib
+import logging
+import threading
+import time
+
+from config import JOB_DB_FILE, JOB_RESUME_MAX_AGE_HOURS
+from storage import connect
+
+logger = logging.getLogger(__name__)
+
+class JobStore:
+    """Penyimpanan checkpoint pekerjaan dokumen (SQLite) agar pemrosesan dapat dilanjutkan setelah gagal/restart."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER,
+                file_id TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                classification TEXT,
+                chunk_count INTEGER,
+                text_hash TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, updated_at);
+            CREATE TABLE IF NOT EXISTS job_chunks (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                corrected TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (job_id, idx)
+            );
+        """)
+
+    @staticmethod
+    def make_job_id(user_id: int, mode: str, file_unique_id: str) -> str:
+        """Unggahan ulang file yang sama oleh pengguna yang sama pada mode yang sama melanjutkan pekerjaan lama."""
+        return f"{user_id}:{mode}:{file_unique_id}"
+
+    def start_job(self, job_id: str, user_id: int, chat_id: int, message_id: int | None,
+                  file_id: str, file_name: str, mode: str) -> bool:
+        """Membuat pekerjaan baru atau mengaktifkan kembali yang belum selesai. Mengembalikan True jika dilanjutkan."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            row = self._conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] != "done":
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', chat_id = ?, message_id = ?, file_id = ?, updated_at = ? "
+                    "WHERE job_id = ?", (chat_id, message_id, file_id, now, job_id))
+                return True
+            self._conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, user_id, chat_id, message_id, file_id, file_name, mode, status, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'running', ?, ?)",
+                (job_id, user_id, chat_id, message_id, file_id, file_name, mode, now, now))
+            return False
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def load_chunks(self, job_id: str) -> dict[int, dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM job_chunks WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["idx"]: dict(row) for row in rows}
+
+    def save_chunk(self, job_id: str, idx: int, text: str):
+        """Mencatat chunk hasil ekstraksi; hasil lama dibuang jika teks chunk berubah."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO job_chunks (job_id, idx, text) VALUES (?, ?, ?)
+                ON CONFLICT(job_id, idx) DO UPDATE SET
+                    corrected = CASE WHEN text = excluded.text THEN corrected END,
+                    status = CASE WHEN text = excluded.text THEN status ELSE 'pending' END,
+                    attempts = CASE WHEN text = excluded.text THEN attempts ELSE 0 END,
+                    text = excluded.text
+                """, (job_id, idx, text))
+
+    def save_result(self, job_id: str, idx: int, corrected: str, status: str, attempts: int,
+                    classification: str | None = None):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "UPDATE job_chunks SET corrected = ?, status = ?, attempts = ? WHERE job_id = ? AND idx = ?",
+                (corrected, status, attempts, job_id, idx))
+            if classification is not None:
+                self._conn.execute("UPDATE jobs SET classification = ?, updated_at = ? WHERE job_id = ?",
+                                   (classification, time.time(), job_id))
+
+    def finish_extraction(self, job_id: str, chunk_count: int, text_hash: str):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM job_chunks WHERE job_id = ? AND idx >= ?", (job_id, chunk_count))
+            self._conn.execute("UPDATE jobs SET chunk_count = ?, text_hash = ?, updated_at = ? WHERE job_id = ?",
+                               (chunk_count, text_hash, time.time(), job_id))
+
+    def set_status(self, job_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                               (status, time.time(), job_id))
+            if status == "done":
+                # Hasil akhir sudah terkirim; teks per chunk tidak diperlukan lagi
+                self._conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def unfinished_jobs(self) -> list[dict]:
+        """Pekerjaan yang terputus dan masih cukup baru untuk dilanjutkan; yang terlalu lama ditandai 'abandoned'."""
+        cutoff = time.time() - JOB_RESUME_MAX_AGE_HOURS * 3600
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("UPDATE jobs SET status = 'abandoned' WHERE status = 'running' AND updated_at < ?",
+                               (cutoff,))
+            self._conn.execute("DELETE FROM job_chunks WHERE job_id IN "
+                               "(SELECT job_id FROM jobs WHERE status = 'abandoned')")
+            rows = self._conn.execute("SELECT * FROM jobs WHERE status = 'running' ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+class JobCheckpoint:
+    """Checkpoint satu pekerjaan yang dipakai pipeline untuk melewati chunk yang sudah selesai."""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self._saved = store.load_chunks(job_id)
+        job = store.get_job(job_id) or {}
+        self.classification = job.get("classification")
+        self._hash = hashlib.sha256()
+
+    def chunk_extracted(self, idx: int, text: str) -> dict | None:
+        """Mencatat chunk baru dan mengembalikan hasil tersimpan jika chunk identik pernah diproses."""
+        if idx:
+            self._hash.update(b"\n\n")
+        self._hash.update(text.encode("utf-8"))
+        saved = self._saved.get(idx)
+        if saved is not None and saved["text"] == text:
+            return saved
+        self.store.save_chunk(self.job_id, idx, text)
+        return None
+
+    def extraction_finished(self, chunk_count: int):
+        self.store.finish_extraction(self.job_id, chunk_count, self._hash.hexdigest())
+
+    def chunk_finished(self, idx: int, corrected: str, status: str, attempts: int, classification: str | None = None):
+        self.store.save_result(self.job_id, idx, corrected, status, attempts, classification)
+
+_job_store: JobStore | None = None
+
+def get_job_store() -> JobStore:
+    """Mengembalikan penyimpanan pekerjaan bersama (dibuka saat pertama kali dipakai)."""
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore(JOB_DB_FILE)
+    return _job_store
@@ -1,9 +1,20 @@
 # main.py
+import asyncio
 import logging
+import multiprocessing
 from telegram.ext import (ApplicationBuilder, CommandHandler, MessageHandler, filters, CallbackQueryHandler)
 
-from config import TELEGRAM_TOKEN
-from bot_handlers import (start, help_command, show_users, handle_button_press, handle_document, unknown_text, check_title)
+import config
+from config import (CONCURRENT_UPDATES, METRICS_HOST, METRICS_PORT, RUN_MODE, QUEUE_WORKERS, TELEGRAM_BASE_URL,
+                    WARM_UP_ON_START)
+from bot_handlers import (start, help_command, show_users, show_metrics, handle_button_press, handle_document, unknown_text, check_title,
+                          resume_unfinished_jobs)
+from ai_service import close_http_client
+from pipeline import warm_up
+from workers import shutdown_workers
+import metrics
+from task_queue import get_task_queue
+from queue_worker import start_worker_processes, stop_worker_processes
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -11,20 +22,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_warm_up_task: asyncio.Task | None = None
+
+async def on_startup(application):
+    """Melanjutkan pekerjaan dokumen yang terputus sebelum bot dimulai ulang dan memulai pemanasan."""
+    global _warm_up_task
+    await resume_unfinished_jobs(application)
+    if WARM_UP_ON_START and RUN_MODE != 'split':
+        # Tidak ditunggu: polling langsung berjalan sementara pemanasan berlangsung di latar belakang
+        _warm_up_task = asyncio.create_task(warm_up())
+
+async def on_shutdown(application):
+    """Menutup sumber daya bersama saat bot berhenti."""
+    if _warm_up_task and not _warm_up_task.done():
+        _warm_up_task.cancel()
+    await close_http_client()
+    shutdown_workers()
+
 def main():
     """Memulai dan menjalankan bot Telegram."""
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    config.validate()
+    application = (ApplicationBuilder().token(config.TELEGRAM_TOKEN)
+                   .base_url(TELEGRAM_BASE_URL)
+                   .concurrent_updates(CONCURRENT_UPDATES)
+                   .post_init(on_startup)
+                   .post_shutdown(on_shutdown)
+                   .build())
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("users", show_users))
+    application.add_handler(CommandHandler("metrics", show_metrics))
     application.add_handler(CommandHandler("checktitle", check_title))
     application.add_handler(CallbackQueryHandler(handle_button_press))
     application.add_handler(MessageHandler(filters.Document.ALL, handle_document))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, unknown_text))
 
-    logger.info("🚀 Bot aktif dan siap digunakan...")
-    application.run_polling()
+    if RUN_MODE == 'split':
+        # Tahap pemrosesan berjalan di proses pekerja; /metrics dan endpoint Prometheus menggabungkan snapshot mereka
+        metrics.set_external_source(get_task_queue().worker_metrics)
+    if METRICS_PORT:
+        metrics.start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+    processes, stop = [], None
+    if RUN_MODE == 'split' and QUEUE_WORKERS:
+        # Proses ini hanya menerima update dan mengisi antrean; dokumen dan judul dikerjakan proses pekerja
+        stop = multiprocessing.get_context("spawn").Event()
+        processes = start_worker_processes(QUEUE_WORKERS, stop)
+
+    logger.info(f"🚀 Bot aktif dan siap digunakan (mode {RUN_MODE})...")
+    try:
+        application.run_polling()
+    finally:
+        if processes:
+            stop_worker_processes(processes, stop)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
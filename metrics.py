@@ -0,0 +1,141 @@
+# metrics.py
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Batas atas bucket histogram durasi (detik), mencakup operasi cepat hingga panggilan LLM yang lambat
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+# (stage, mode) -> [jumlah per bucket..., +Inf], total detik, jumlah observasi
+_durations: dict[tuple[str, str], dict] = {}
+# (nama metrik, mode, stage) -> nilai
+_counters: dict[tuple[str, str, str], float] = {}
+# Sumber snapshot metrik proses lain (mode split: proses pekerja antrean), digabung saat metrik dibaca
+_external_source: Callable[[], list[dict]] | None = None
+
+def observe_duration(stage: str, mode: str, seconds: float):
+    """Mencatat durasi satu tahap ke histogram."""
+    with _lock:
+        entry = _durations.setdefault((stage, mode), {
+            "buckets": [0] * (len(DURATION_BUCKETS) + 1), "sum": 0.0, "count": 0})
+        entry["buckets"][bisect_left(DURATION_BUCKETS, seconds)] += 1
+        entry["sum"] += seconds
+        entry["count"] += 1
+
+def inc(name: str, mode: str, value: float = 1, stage: str = ""):
+    """Menambah nilai counter, misalnya jumlah byte, karakter, chunk, atau error."""
+    with _lock:
+        key = (name, mode, stage)
+        _counters[key] = _counters.get(key, 0) + value
+
+@contextmanager
+def stage_timer(stage: str, mode: str):
+    """Mengukur durasi blok kode sebagai satu tahap; error dicatat lalu diteruskan."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("stage_errors", mode, stage=stage)
+        raise
+    finally:
+        observe_duration(stage, mode, time.perf_counter() - started)
+
+def snapshot() -> dict:
+    """Salinan metrik proses ini dalam bentuk yang dapat disimpan sebagai JSON."""
+    with _lock:
+        return {"durations": [[stage, mode, list(entry["buckets"]), entry["sum"], entry["count"]]
+                              for (stage, mode), entry in _durations.items()],
+                "counters": [[name, mode, stage, value] for (name, mode, stage), value in _counters.items()]}
+
+def set_external_source(source: Callable[[], list[dict]] | None):
+    """Mendaftarkan fungsi yang mengembalikan snapshot metrik proses lain untuk ikut ditampilkan."""
+    global _external_source
+    _external_source = source
+
+def _collect() -> tuple[dict[tuple[str, str], dict], dict[tuple[str, str, str], float]]:
+    """Metrik proses ini digabung dengan snapshot dari sumber eksternal (jika ada)."""
+    with _lock:
+        durations = {key: dict(entry, buckets=list(entry["buckets"])) for key, entry in _durations.items()}
+        counters = dict(_counters)
+    if _external_source is not None:
+        try:
+            snapshots = _external_source()
+        except Exception as e:
+            logger.error(f"Gagal membaca metrik proses pekerja: {e}")
+            snapshots = []
+        for snap in snapshots:
+            for stage, mode, buckets, seconds, count in snap["durations"]:
+                entry = durations.setdefault((stage, mode), {
+                    "buckets": [0] * (len(DURATION_BUCKETS) + 1), "sum": 0.0, "count": 0})
+                entry["buckets"] = [a + b for a, b in zip(entry["buckets"], buckets)]
+                entry["sum"] += seconds
+                entry["count"] += count
+            for name, mode, stage, value in snap["counters"]:
+                counters[(name, mode, stage)] = counters.get((name, mode, stage), 0) + value
+    return durations, counters
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items() if value) + "}"
+
+def render_prometheus() -> str:
+    """Menyusun seluruh metrik dalam format teks Prometheus."""
+    durations, counters = _collect()
+    lines = ["# HELP insightdoc_stage_duration_seconds Durasi tiap tahap pemrosesan.",
+             "# TYPE insightdoc_stage_duration_seconds histogram"]
+    for (stage, mode), entry in sorted(durations.items()):
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS + ("+Inf",), entry["buckets"]):
+            cumulative += count
+            lines.append(f"insightdoc_stage_duration_seconds_bucket{_labels(stage=stage, mode=mode, le=str(bound))} {cumulative}")
+        lines.append(f"insightdoc_stage_duration_seconds_sum{_labels(stage=stage, mode=mode)} {entry['sum']:.6f}")
+        lines.append(f"insightdoc_stage_duration_seconds_count{_labels(stage=stage, mode=mode)} {entry['count']}")
+    names = sorted({name for name, _, _ in counters})
+    for name in names:
+        lines.append(f"# TYPE insightdoc_{name}_total counter")
+        for (counter, mode, stage), value in sorted(counters.items()):
+            if counter == name:
+                lines.append(f"insightdoc_{name}_total{_labels(stage=stage, mode=mode)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+def summary() -> list[dict]:
+    """Ringkasan per tahap dan mode (jumlah, rata-rata durasi, error) untuk ditampilkan ke admin."""
+    durations, counters = _collect()
+    return [{"stage": stage, "mode": mode, "count": entry["count"],
+             "avg": entry["sum"] / entry["count"] if entry["count"] else 0.0,
+             "errors": int(counters.get(("stage_errors", mode, stage), 0))}
+            for (stage, mode), entry in sorted(durations.items())]
+
+def counter_totals() -> dict[tuple[str, str], float]:
+    """Total counter non-error per (nama metrik, mode)."""
+    _, counters = _collect()
+    return {(name, mode): value for (name, mode, stage), value in counters.items() if not stage}
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Menyajikan /metrics (format Prometheus) di thread latar belakang."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"📈 Endpoint metrik aktif di http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,245 @@
+# pipeline.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Hashable
+
+from config import (MAX_PARALLEL_CHUNKS_PER_DOC, PDF_PAGES_PER_TASK, MAX_CHUNK_ATTEMPTS, CHUNK_RETRY_DELAY,
+                    CPU_POOL_WORKERS)
+from ai_service import correct_and_classify_text, correction_chunk_budget, warm_up_http_client
+from utils import (DocumentSource, LogicalChunker, ExtractionError, extract_segments, iter_segments_checked,
+                   pdf_page_count, extract_pdf_pages, final_spell_check_chunks, warm_up_worker)
+from diff_report import DiffReport, build_diff_report
+from workers import run_cpu
+from job_store import JobCheckpoint
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Dipanggil dengan (jumlah selesai, total); total bernilai None selama ekstraksi belum selesai
+ProgressCallback = Callable[[int, int | None], Awaitable[None]]
+# Dipanggil dengan nama tahap ("llm", "spell_check", "diff") saat tahap tersebut dimulai
+StageCallback = Callable[[str], Awaitable[None]]
+
+EMPTY_DOCUMENT_MESSAGE = "❌ Tidak ada teks yang dapat diekstrak dari dokumen."
+
+@dataclass
+class DocumentResult:
+    """Hasil lengkap pemrosesan satu dokumen, terlepas dari cara hasil tersebut dikirim."""
+    chunks: list[str]
+    corrected_chunks: list[str]
+    classification: str
+    final_text: str
+    diff_report: DiffReport
+    # Durasi per tahap dalam detik; "extract" dan "llm" (sejak chunk pertama) saling tumpang tindih
+    # karena berjalan bersamaan
+    timings: dict[str, float] = field(default_factory=dict)
+
+async def warm_up():
+    """Menyiapkan pool pekerja (pustaka format dan kamus ejaan) serta koneksi Groq sebelum dokumen pertama."""
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_cpu(warm_up_worker) for _ in range(CPU_POOL_WORKERS)),
+                                   warm_up_http_client(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"Pemanasan sebagian gagal: {result}")
+    logger.info(f"🔥 Pemanasan selesai dalam {time.perf_counter() - started:.2f} detik.")
+
+async def iter_document_segments(source: DocumentSource, file_name: str | None = None) -> AsyncIterator[str]:
+    """Menghasilkan teks dokumen per halaman/paragraf/blok baris begitu tersedia.
+
+    `source` berupa path atau isi berkas di memori; untuk bytes, format ditentukan dari `file_name`.
+    - .pdf: rentang halaman diekstrak paralel di pool pekerja, paling banyak CPU_POOL_WORKERS sekaligus.
+    - .txt: dibaca bertahap per blok baris di thread (hanya I/O dan decode), sehingga chunk pertama
+      segera tersedia dan berkas di disk tidak dimuat utuh ke memori.
+    - .docx: python-docx selalu mem-parsing seluruh dokumen sekaligus, jadi paragrafnya diekstrak
+      utuh dalam satu tugas pool pekerja; streaming di sini tidak menurunkan puncak memori.
+    """
+    ext = os.path.splitext(file_name or (source if isinstance(source, str) else ""))[-1].lower()
+    if ext == ".txt":
+        segments = iter_segments_checked(source, file_name)
+        try:
+            while (segment := await asyncio.to_thread(next, segments, None)) is not None:
+                yield segment
+        finally:
+            # Jika dibatalkan saat next() masih berjalan di thread, generator akan selesai sendiri
+            with suppress(ValueError):
+                segments.close()
+        return
+    if ext != ".pdf":
+        for segment in await run_cpu(extract_segments, source, file_name):
+            yield segment
+        return
+
+    page_count = await run_cpu(pdf_page_count, source)
+    starts = iter(range(0, page_count, PDF_PAGES_PER_TASK))
+
+    def extract_next_range() -> asyncio.Future | None:
+        start = next(starts, None)
+        if start is None:
+            return None
+        return asyncio.ensure_future(run_cpu(extract_pdf_pages, source, start,
+                                             min(start + PDF_PAGES_PER_TASK, page_count)))
+
+    # Hanya beberapa rentang yang diekstrak sekaligus, agar satu PDF besar tidak memenuhi antrean pool
+    # pekerja (dokumen pengguna lain tetap mendapat giliran) dan hasil ekstraksi tidak menumpuk di memori
+    tasks = deque(task for task in (extract_next_range() for _ in range(CPU_POOL_WORKERS)) if task)
+    try:
+        # Rentang diserahkan berurutan begitu siap, sementara rentang berikutnya masih diekstrak
+        while tasks:
+            pages = await tasks.popleft()
+            if next_task := extract_next_range():
+                tasks.append(next_task)
+            for page_text in pages:
+                yield page_text
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def iter_document_chunks(source: DocumentSource, max_tokens: int | None = None,
+                               file_name: str | None = None) -> AsyncIterator[str]:
+    """Menghasilkan chunk logis segera setelah teks yang cukup selesai diekstrak."""
+    chunker = LogicalChunker(max_tokens or correction_chunk_budget())
+    async for segment in iter_document_segments(source, file_name):
+        for chunk in chunker.feed(segment):
+            yield chunk
+    for chunk in chunker.finish():
+        yield chunk
+
+async def _correct_with_retries(chunk: str, is_first_chunk: bool, mode: str, attempts: int,
+                                user_key: Hashable) -> tuple[dict, int]:
+    """Mencoba mengoreksi chunk hingga MAX_CHUNK_ATTEMPTS kali (termasuk percobaan sebelum restart)."""
+    result = {"error": "Batas percobaan koreksi chunk telah tercapai."}
+    while attempts < MAX_CHUNK_ATTEMPTS:
+        attempts += 1
+        result = await correct_and_classify_text(chunk, is_first_chunk, mode, user_key=user_key)
+        if "error" not in result:
+            break
+        if attempts < MAX_CHUNK_ATTEMPTS:
+            await asyncio.sleep(CHUNK_RETRY_DELAY * attempts)
+    return result, attempts
+
+async def correct_chunks(chunk_source: AsyncIterable[str], mode: str, on_progress: ProgressCallback | None = None,
+                         user_key: Hashable = None,
+                         checkpoint: JobCheckpoint | None = None) -> tuple[list[str], list[str], str]:
+    """Mengoreksi chunk secara paralel (terbatas) begitu chunk tersedia, lalu menyusunnya sesuai urutan asli.
+
+    Batas global dan pembagian giliran antar pengguna diatur oleh penjadwal LLM berdasarkan `user_key`.
+    Dengan `checkpoint`, setiap hasil disimpan dan chunk yang sudah selesai sebelumnya tidak dikirim ulang.
+
+    Mengembalikan chunk asli, chunk hasil koreksi, serta klasifikasi dari chunk pertama.
+    """
+    chunks: list[str] = []
+    corrected: list[str] = []
+    classification = (checkpoint and checkpoint.classification) or "Tidak Diketahui"
+    doc_slots = asyncio.Semaphore(MAX_PARALLEL_CHUNKS_PER_DOC)
+    progress_lock = asyncio.Lock()
+    finished = 0
+    total: int | None = None
+
+    async def correct_one(i: int, chunk: str, saved: dict | None):
+        nonlocal classification, finished
+        if saved is not None and saved["status"] == "done":
+            corrected[i] = saved["corrected"]
+        else:
+            async with doc_slots:
+                result, attempts = await _correct_with_retries(
+                    chunk, i == 0, mode, saved["attempts"] if saved else 0, user_key)
+            chunk_classification = None
+            if "error" in result:
+                logger.warning(f"Chunk {i + 1} gagal dikoreksi setelah {attempts} percobaan, "
+                               f"memakai teks asli: {result['error']}")
+                metrics.inc("chunk_fallbacks", mode)
+            else:
+                corrected[i] = result.get("koreksi_teks", chunk)
+                if i == 0: classification = chunk_classification = result.get("klasifikasi", "Tidak Diketahui")
+            if checkpoint:
+                checkpoint.chunk_finished(i, corrected[i], "fallback" if "error" in result else "done",
+                                          attempts, chunk_classification)
+        if on_progress:
+            # Lock menjaga agar laporan progres tidak saling mendahului
+            async with progress_lock:
+                finished += 1
+                await on_progress(finished, total)
+
+    tasks = []
+    try:
+        async for chunk in chunk_source:
+            i = len(chunks)
+            chunks.append(chunk)
+            corrected.append(chunk)
+            saved = checkpoint.chunk_extracted(i, chunk) if checkpoint else None
+            tasks.append(asyncio.create_task(correct_one(i, chunk, saved)))
+        total = len(chunks)
+        if checkpoint:
+            checkpoint.extraction_finished(total)
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return chunks, corrected, classification
+
+async def process_document(source: DocumentSource, mode: str, on_progress: ProgressCallback | None = None,
+                           on_stage: StageCallback | None = None, user_key: Hashable = None,
+                           checkpoint: JobCheckpoint | None = None, file_name: str | None = None) -> DocumentResult:
+    """Menjalankan seluruh pipeline ekstraksi → chunk → LLM → ejaan → diff untuk satu dokumen.
+
+    Dokumen dapat diberikan sebagai path atau sebagai isi berkas di memori beserta `file_name`.
+
+    Melempar ExtractionError jika dokumen tidak dapat dibaca atau tidak berisi teks.
+    """
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    llm_started: float | None = None
+    stage = "extract"
+
+    async def timed_chunks() -> AsyncIterator[str]:
+        nonlocal llm_started
+        async for chunk in iter_document_chunks(source, file_name=file_name):
+            # Tahap LLM dihitung sejak chunk pertama dikirim, bukan sejak ekstraksi dimulai
+            if llm_started is None:
+                llm_started = time.perf_counter()
+            yield chunk
+        timings["extract"] = time.perf_counter() - started
+
+    try:
+        if on_stage: await on_stage("llm")
+        chunks, corrected, classification = await correct_chunks(timed_chunks(), mode, on_progress=on_progress,
+                                                                 user_key=user_key, checkpoint=checkpoint)
+        if not chunks:
+            raise ExtractionError(EMPTY_DOCUMENT_MESSAGE)
+        timings["llm"] = time.perf_counter() - llm_started
+
+        stage = "spell_check"
+        if on_stage: await on_stage(stage)
+        stage_started = time.perf_counter()
+        # Ejaan diperiksa per chunk agar batas chunk tetap terjaga untuk diff
+        final_chunks = await run_cpu(final_spell_check_chunks, corrected)
+        final_text = "\n\n".join(final_chunks)
+        timings["spell_check"] = time.perf_counter() - stage_started
+
+        stage = "diff"
+        if on_stage: await on_stage(stage)
+        stage_started = time.perf_counter()
+        diff_report = await run_cpu(build_diff_report, chunks, final_chunks)
+        timings["diff"] = time.perf_counter() - stage_started
+    except Exception:
+        # Tahap yang gagal: ekstraksi jika belum selesai, selain itu tahap yang sedang berjalan
+        if stage == "extract" and "extract" in timings:
+            stage = "llm"
+        metrics.inc("stage_errors", mode, stage=stage)
+        raise
+
+    timings["total"] = time.perf_counter() - started
+    for name, seconds in timings.items():
+        metrics.observe_duration(name, mode, seconds)
+    metrics.inc("documents", mode)
+    metrics.inc("document_chars", mode, sum(len(chunk) for chunk in chunks))
+    metrics.inc("words_changed", mode, diff_report.words_changed)
+    metrics.inc("document_chunks", mode, len(chunks))
+    return DocumentResult(chunks, corrected, classification, final_text, diff_report, timings)
@@ -0,0 +1,86 @@
+# progress.py
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from telegram.error import BadRequest, RetryAfter
+
+from config import TELEGRAM_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Batas panjang pesan Telegram; teks parsial yang lebih panjang dipotong dari depan
+MAX_MESSAGE_LENGTH = 4096
+
+class ThrottledEditor:
+    """Menggabungkan pembaruan pesan progres agar edit ke Telegram tidak melebihi satu kali per `min_interval`.
+
+    Hanya teks terbaru yang dikirim; teks yang sama dengan kiriman sebelumnya dilewati.
+    """
+
+    def __init__(self, edit: Callable[..., Awaitable], min_interval: float = TELEGRAM_EDIT_INTERVAL):
+        self._edit = edit
+        self.min_interval = min_interval
+        self._pending: str | None = None
+        self._last_sent: str | None = None
+        self._next_allowed = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def update(self, text: str):
+        """Menjadwalkan teks progres terbaru tanpa menunggu edit selesai."""
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = "…" + text[-(MAX_MESSAGE_LENGTH - 1):]
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    async def finish(self, text: str, **kwargs):
+        """Mengirim teks akhir (mis. dengan parse_mode) setelah membatalkan pembaruan yang tertunda."""
+        self._pending = None
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        while True:
+            await self._wait_turn()
+            try:
+                await self._send(text, **kwargs)
+                return
+            except RetryAfter as e:
+                self._defer(e)
+
+    async def _wait_turn(self):
+        delay = self._next_allowed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _defer(self, error: RetryAfter):
+        retry_after = error.retry_after
+        seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+        logger.warning(f"Telegram membatasi edit pesan, menunggu {seconds:.0f} dtk.")
+        self._next_allowed = time.monotonic() + seconds
+
+    async def _send(self, text: str, **kwargs):
+        if text == self._last_sent and not kwargs:
+            return
+        try:
+            await self._edit(text, **kwargs)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        self._last_sent = text
+        self._next_allowed = time.monotonic() + self.min_interval
+
+    async def _drain(self):
+        while self._pending is not None:
+            await self._wait_turn()
+            text, self._pending = self._pending, None
+            try:
+                await self._send(text)
+            except RetryAfter as e:
+                self._defer(e)
+                if self._pending is None:
+                    self._pending = text
+            except Exception as e:
+                # Pesan progres bersifat sementara; kegagalannya tidak boleh menghentikan pemrosesan
+                logger.debug(f"Gagal memperbarui pesan progres: {e}")
@@ -0,0 +1,191 @@
+# queue_worker.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from multiprocessing.synchronize import Event
+
+from telegram import Bot
+from telegram.constants import ParseMode
+from telegram.error import TelegramError
+
+import config
+from config import (TELEGRAM_BASE_URL, QUEUE_WORKERS, QUEUE_TASKS_PER_WORKER, QUEUE_VISIBILITY_TIMEOUT,
+                    QUEUE_POLL_INTERVAL, GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, MAX_PARALLEL_LLM_CALLS,
+                    CPU_POOL_WORKERS, METRICS_PUBLISH_INTERVAL, WARM_UP_ON_START)
+from task_queue import TaskQueue, get_task_queue
+from job_store import get_job_store
+from bot_handlers import run_document_job, run_title_job
+from pipeline import warm_up
+from ai_service import close_http_client
+from workers import shutdown_workers
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Jeda sebelum tugas yang gagal dicoba lagi, dikalikan jumlah percobaan
+_RETRY_DELAY_SECONDS = 5
+
+async def _run_task(bot: Bot, task: dict):
+    payload = task["payload"]
+    if task["kind"] == "document":
+        job = get_job_store().get_job(payload["job_id"])
+        if job is None or job["status"] != "running":
+            # Sudah selesai atau gagal (dan dilaporkan) pada percobaan sebelumnya
+            return
+        await run_document_job(bot, job, file_size=payload.get("file_size", 0))
+    elif task["kind"] == "title":
+        await run_title_job(bot, **payload)
+    else:
+        raise ValueError(f"Jenis tugas tidak dikenal: {task['kind']}")
+
+async def _give_up(bot: Bot, task: dict):
+    """Menghentikan tugas yang sudah mencapai batas percobaan dan memberi tahu pengguna."""
+    payload = task["payload"]
+    logger.error(f"Tugas {task['task_id']} ({task['kind']}) gagal setelah {task['attempts']} percobaan: {task['error']}")
+    if task["kind"] == "document":
+        store = get_job_store()
+        job = store.get_job(payload["job_id"])
+        if job is None or job["status"] != "running":
+            return
+        # Status 'failed' mencegah pekerjaan ini dimasukkan ulang ke antrean saat bot dimulai ulang
+        store.set_status(job["job_id"], "failed")
+        chat_id, message_id = job["chat_id"], job["message_id"]
+        text = (f"❌ Dokumen `{job['file_name']}` gagal diproses setelah {task['attempts']} percobaan.\n"
+                "Kirim ulang dokumen yang sama untuk mencoba lagi dari bagian terakhir yang selesai.")
+    elif task["kind"] == "title":
+        chat_id, message_id = payload["chat_id"], payload["message_id"]
+        text = "❌ Analisis judul gagal setelah beberapa percobaan. Silakan coba lagi nanti."
+    else:
+        return
+    try:
+        await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, parse_mode=ParseMode.MARKDOWN)
+    except TelegramError as e:
+        logger.error(f"Gagal memberi tahu obrolan {chat_id} tentang tugas yang gagal: {e}")
+
+async def _keep_alive(queue: TaskQueue, task: dict):
+    """Memperpanjang sewa tugas secara berkala selama tugas masih dikerjakan."""
+    while True:
+        await asyncio.sleep(QUEUE_VISIBILITY_TIMEOUT / 3)
+        if not queue.extend(task, QUEUE_VISIBILITY_TIMEOUT):
+            logger.warning(f"Sewa tugas {task['task_id']} sudah kedaluwarsa; tugas mungkin dikerjakan ganda.")
+            return
+
+async def _handle_task(bot: Bot, queue: TaskQueue, task: dict, slots: asyncio.Semaphore):
+    keep_alive = asyncio.create_task(_keep_alive(queue, task))
+    try:
+        if task["exhausted"]:
+            await _give_up(bot, task)
+            queue.fail(task)
+            return
+        await _run_task(bot, task)
+        queue.complete(task)
+    except asyncio.CancelledError:
+        # Pekerja dihentikan: tugas segera dikembalikan ke antrean dan dilanjutkan dari checkpoint
+        queue.release(task)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Tugas {task['task_id']} ({task['kind']}) gagal pada percobaan ke-{task['attempts']}: {e}")
+        queue.release(task, str(e), delay=_RETRY_DELAY_SECONDS * task["attempts"])
+    finally:
+        keep_alive.cancel()
+        slots.release()
+
+async def _publish_metrics(worker_id: str):
+    """Menyimpan snapshot metrik secara berkala; proses front menggabungkannya untuk /metrics."""
+    queue = get_task_queue()
+    try:
+        while True:
+            queue.publish_metrics(worker_id, metrics.snapshot())
+            await asyncio.sleep(METRICS_PUBLISH_INTERVAL)
+    finally:
+        # Snapshot terakhir saat pekerja berhenti agar metrik tugas terakhir tidak hilang
+        queue.publish_metrics(worker_id, metrics.snapshot())
+
+async def _consume(bot: Bot, worker_id: str):
+    queue = get_task_queue()
+    slots = asyncio.Semaphore(QUEUE_TASKS_PER_WORKER)
+    running: set[asyncio.Task] = set()
+    try:
+        while True:
+            await slots.acquire()
+            task = queue.claim(worker_id, QUEUE_VISIBILITY_TIMEOUT)
+            if task is None:
+                slots.release()
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
+                continue
+            handler = asyncio.create_task(_handle_task(bot, queue, task, slots))
+            running.add(handler)
+            handler.add_done_callback(running.discard)
+    finally:
+        for handler in running:
+            handler.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+async def serve(worker_id: str, stop: Event):
+    """Mengambil dan mengerjakan tugas dari antrean hingga `stop` diset."""
+    async with Bot(config.TELEGRAM_TOKEN, base_url=TELEGRAM_BASE_URL) as bot:
+        consumer = asyncio.create_task(_consume(bot, worker_id))
+        publisher = asyncio.create_task(_publish_metrics(worker_id))
+        warm_up_task = asyncio.create_task(warm_up()) if WARM_UP_ON_START else None
+        try:
+            while not stop.is_set() and not consumer.done():
+                await asyncio.sleep(1)
+        finally:
+            if warm_up_task:
+                warm_up_task.cancel()
+            consumer.cancel()
+            result, = await asyncio.gather(consumer, return_exceptions=True)
+            publisher.cancel()
+            await asyncio.gather(publisher, return_exceptions=True)
+            if isinstance(result, Exception):
+                logger.error(f"❌ Pekerja {worker_id} berhenti karena error: {result}")
+            await close_http_client()
+            shutdown_workers()
+
+def run_worker_process(index: int, stop: Event):
+    """Titik masuk satu proses pekerja."""
+    logging.basicConfig(format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s',
+                        level=logging.INFO)
+    # Ctrl+C ditangani proses induk, yang lalu menghentikan pekerja lewat `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(serve(f"worker-{index}", stop))
+
+def start_worker_processes(count: int, stop: Event) -> list[multiprocessing.Process]:
+    """Menjalankan `count` proses pekerja antrean."""
+    # Setiap proses memiliki penjadwal LLM dan pool CPU sendiri, jadi kuota Groq dan pool dibagi rata
+    os.environ["GROQ_REQUESTS_PER_MINUTE"] = str(GROQ_REQUESTS_PER_MINUTE / count)
+    os.environ["GROQ_TOKENS_PER_MINUTE"] = str(GROQ_TOKENS_PER_MINUTE / count)
+    os.environ["MAX_PARALLEL_LLM_CALLS"] = str(max(1, MAX_PARALLEL_LLM_CALLS // count))
+    os.environ["CPU_POOL_WORKERS"] = str(max(1, CPU_POOL_WORKERS // count))
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker_process, args=(i, stop), name=f"queue-worker-{i}")
+                 for i in range(count)]
+    for process in processes:
+        process.start()
+    logger.info(f"👷 {count} proses pekerja antrean dijalankan.")
+    return processes
+
+def stop_worker_processes(processes: list[multiprocessing.Process], stop: Event, timeout: float = 30):
+    """Menghentikan proses pekerja; tugas yang sedang berjalan dikembalikan ke antrean."""
+    stop.set()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning(f"Proses {process.name} tidak berhenti dalam {timeout} detik; dihentikan paksa.")
+            process.terminate()
+
+def main():
+    """Menjalankan pekerja antrean saja (tanpa menerima update Telegram), mis. saat front berjalan terpisah."""
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    stop = multiprocessing.get_context("spawn").Event()
+    processes = start_worker_processes(QUEUE_WORKERS, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop_worker_processes(processes, stop)
+
+if __name__ == '__main__':
+    main()
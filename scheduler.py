@@ -0,0 +1,193 @@
+# scheduler.py
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable
+
+from config import GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, MAX_PARALLEL_LLM_CALLS
+
+logger = logging.getLogger(__name__)
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+class TokenBucket:
+    """Token bucket sederhana: kapasitas terisi ulang secara kontinu sebesar `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Detik yang perlu ditunggu hingga `amount` tersedia (0 jika sudah cukup)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+class _Waiter:
+    __slots__ = ("future", "tokens")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+
+class LLMScheduler:
+    """Penjadwal pusat panggilan LLM: batas RPM/TPM global dan pembagian kapasitas round-robin antar pengguna."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_concurrent: int):
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._max_concurrent = max_concurrent
+        self._running = 0
+        self._paused_until = 0.0
+        self._queues: dict[Hashable, deque[_Waiter]] = {}
+        self._rotation: deque[Hashable] = deque()
+        self._subscribers: dict[Hashable, list] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def slot(self, user_key: Hashable, tokens: int, priority: bool = False) -> AsyncIterator[None]:
+        """Menunggu giliran `user_key` lalu menahan satu slot panggilan LLM selama blok berjalan.
+
+        `priority` menaruh permintaan di depan antrean milik pengguna itu sendiri (mis. /checktitle).
+        """
+        self._ensure_dispatcher()
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+        queue = self._queues.get(user_key)
+        if queue is None:
+            queue = self._queues[user_key] = deque()
+            self._rotation.append(user_key)
+        if priority:
+            queue.appendleft(waiter)
+        else:
+            queue.append(waiter)
+        self._wake()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release()
+            else:
+                self._discard(user_key, waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def backoff(self, seconds: float):
+        """Menahan seluruh panggilan baru selama `seconds` (mis. setelah 429 dengan Retry-After)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._wake()
+
+    def position(self, user_key: Hashable) -> int | None:
+        """Jumlah pengguna lain yang akan dilayani lebih dulu; None jika pengguna tidak sedang mengantre."""
+        try:
+            return self._rotation.index(user_key)
+        except ValueError:
+            return None
+
+    def subscribe(self, user_key: Hashable, callback: PositionCallback) -> Callable[[], None]:
+        """Mendaftarkan callback yang dipanggil setiap kali posisi antrean pengguna berubah."""
+        entry = [callback, None]
+        self._subscribers.setdefault(user_key, []).append(entry)
+
+        def unsubscribe():
+            entries = self._subscribers.get(user_key, [])
+            if entry in entries:
+                entries.remove(entry)
+            if not entries:
+                self._subscribers.pop(user_key, None)
+        return unsubscribe
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _release(self):
+        self._running -= 1
+        self._wake()
+
+    def _discard(self, user_key: Hashable, waiter: _Waiter):
+        queue = self._queues.get(user_key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                self._drop_user(user_key)
+        self._wake()
+
+    def _drop_user(self, user_key: Hashable):
+        del self._queues[user_key]
+        self._rotation.remove(user_key)
+
+    async def _sleep_or_wake(self, timeout: float | None):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            self._notify_positions()
+            if not self._rotation or self._running >= self._max_concurrent:
+                await self._sleep_or_wake(None)
+                continue
+            user_key = self._rotation[0]
+            queue = self._queues[user_key]
+            waiter = queue[0]
+            if waiter.future.done():
+                # Pemanggil sudah dibatalkan; bersihkan tanpa memakai kapasitas
+                queue.popleft()
+                if not queue:
+                    self._drop_user(user_key)
+                continue
+            wait = max(self._paused_until - time.monotonic(),
+                       self._requests.wait_time(1), self._tokens.wait_time(waiter.tokens))
+            if wait > 0:
+                await self._sleep_or_wake(wait)
+                continue
+            self._requests.consume(1)
+            self._tokens.consume(waiter.tokens)
+            queue.popleft()
+            # Round-robin: pengguna yang baru dilayani pindah ke belakang antrean giliran
+            self._rotation.rotate(-1)
+            if not queue:
+                self._drop_user(user_key)
+            self._running += 1
+            waiter.future.set_result(None)
+
+    def _notify_positions(self):
+        for user_key, entries in self._subscribers.items():
+            position = self.position(user_key)
+            for entry in entries:
+                if position is not None and position != entry[1]:
+                    entry[1] = position
+                    asyncio.create_task(entry[0](position))
+
+_scheduler: LLMScheduler | None = None
+
+def get_scheduler() -> LLMScheduler:
+    """Mengembalikan penjadwal LLM bersama untuk proses ini."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, MAX_PARALLEL_LLM_CALLS)
+    return _scheduler
@@ -0,0 +1,10 @@
+# storage.py
+import sqlite3
+
+def connect(path: str) -> sqlite3.Connection:
+    """Membuka koneksi SQLite dalam mode WAL agar pembaca tidak terblokir oleh penulis."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
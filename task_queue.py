@@ -0,0 +1,140 @@
+# task_queue.py
+import json
+import logging
+import threading
+import time
+import uuid
+
+from config import QUEUE_DB_FILE, QUEUE_MAX_ATTEMPTS
+from storage import connect
+
+logger = logging.getLogger(__name__)
+
+class TaskQueue:
+    """Antrean tugas lokal yang tahan restart (SQLite), dipakai bersama oleh proses front dan proses pekerja.
+
+    Tugas yang diambil pekerja disembunyikan selama batas waktu visibilitas. Jika pekerja mati sebelum
+    menyelesaikannya, tugas terlihat lagi dan diambil pekerja lain (at-least-once).
+    """
+
+    def __init__(self, path: str, max_attempts: int):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                dedupe_key TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                visible_at REAL NOT NULL,
+                lease TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_visible ON tasks(status, visible_at);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_dedupe ON tasks(dedupe_key)
+                WHERE status = 'queued' AND dedupe_key IS NOT NULL;
+            CREATE TABLE IF NOT EXISTS worker_metrics (
+                worker_id TEXT PRIMARY KEY,
+                snapshot TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+
+    def enqueue(self, kind: str, payload: dict, dedupe_key: str | None = None) -> int | None:
+        """Menambahkan tugas. Mengembalikan None jika tugas dengan `dedupe_key` yang sama masih menunggu/berjalan."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, payload, dedupe_key, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (kind, json.dumps(payload), dedupe_key, now, now, now))
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, worker_id: str, visibility_timeout: float) -> dict | None:
+        """Mengambil tugas tertua yang terlihat dan menyembunyikannya selama `visibility_timeout` detik.
+
+        Tugas yang sudah mencapai batas percobaan dikembalikan dengan `exhausted=True`: pekerja tidak
+        menjalankannya lagi, melainkan memberi tahu pengguna lalu memanggil `fail()`. Jika pekerja mati
+        sebelum itu, tugas terlihat lagi seperti biasa sehingga pemberitahuan tidak hilang.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            # IMMEDIATE mengunci penulisan sejak awal agar dua proses tidak mengambil tugas yang sama
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT * FROM tasks WHERE status = 'queued' AND visible_at <= ? ORDER BY task_id LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                return None
+            exhausted = row["attempts"] >= self.max_attempts
+            lease = f"{worker_id}:{uuid.uuid4().hex}"
+            self._conn.execute(
+                "UPDATE tasks SET attempts = attempts + ?, visible_at = ?, lease = ?, updated_at = ? "
+                "WHERE task_id = ?", (0 if exhausted else 1, now + visibility_timeout, lease, now, row["task_id"]))
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["attempts"] += 0 if exhausted else 1
+        task["lease"] = lease
+        task["exhausted"] = exhausted
+        return task
+
+    def extend(self, task: dict, visibility_timeout: float) -> bool:
+        """Memperpanjang masa sembunyi tugas yang masih dikerjakan. False jika sewa sudah diambil pekerja lain."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET visible_at = ?, updated_at = ? WHERE task_id = ? AND lease = ? AND status = 'queued'",
+                (now + visibility_timeout, now, task["task_id"], task["lease"]))
+        return cursor.rowcount > 0
+
+    def complete(self, task: dict):
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ? AND lease = ?", (task["task_id"], task["lease"]))
+
+    def fail(self, task: dict):
+        """Menandai tugas gagal permanen; baris disimpan untuk pemeriksaan dan tidak diambil lagi."""
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET status = 'failed', updated_at = ? WHERE task_id = ? AND lease = ?",
+                               (time.time(), task["task_id"], task["lease"]))
+
+    def release(self, task: dict, error: str | None = None, delay: float = 0):
+        """Mengembalikan tugas ke antrean agar dicoba lagi setelah `delay` detik.
+
+        Tanpa `error` (misalnya pekerja dihentikan), percobaan ini tidak dihitung.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET visible_at = ?, lease = NULL, error = COALESCE(?, error), "
+                "attempts = attempts - ?, updated_at = ? WHERE task_id = ? AND lease = ?",
+                (now + delay, error, 0 if error or task.get("exhausted") else 1, now, task["task_id"], task["lease"]))
+
+    def pending_count(self) -> int:
+        """Jumlah tugas yang menunggu atau sedang dikerjakan."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tasks WHERE status = 'queued'").fetchone()[0]
+
+    def publish_metrics(self, worker_id: str, snapshot: dict):
+        """Menyimpan snapshot metrik proses pekerja agar dapat ditampilkan oleh proses front."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO worker_metrics (worker_id, snapshot, updated_at) VALUES (?, ?, ?)",
+                (worker_id, json.dumps(snapshot), time.time()))
+
+    def worker_metrics(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT snapshot FROM worker_metrics").fetchall()
+        return [json.loads(row["snapshot"]) for row in rows]
+
+_task_queue: TaskQueue | None = None
+
+def get_task_queue() -> TaskQueue:
+    """Mengembalikan antrean tugas bersama (dibuka saat pertama kali dipakai)."""
+    global _task_queue
+    if _task_queue is None:
+        _task_queue = TaskQueue(QUEUE_DB_FILE, QUEUE_MAX_ATTEMPTS)
+    return _task_queue
@@ -1,43 +1,77 @@
 # user_manager.py
 import os
 import json
+import logging
+import threading
+import sqlite3
 from datetime import datetime
-from filelock import FileLock
-from config import USER_DATA_FILE
+from config import USER_DATA_FILE, USER_DB_FILE
+from storage import connect
 
-def load_user_data():
-    """Memuat data pengguna dari file JSON."""
-    if not os.path.exists(USER_DATA_FILE) or os.path.getsize(USER_DATA_FILE) == 0:
-        return {}
-    with open(USER_DATA_FILE, 'r') as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+logger = logging.getLogger(__name__)
 
-def save_user_data(data):
-    """Menyimpan data pengguna ke file JSON."""
-    with open(USER_DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+_conn: sqlite3.Connection | None = None
+_conn_lock = threading.Lock()
+
+def _get_connection() -> sqlite3.Connection:
+    """Membuka database pengguna sekali per proses dan menyiapkan skema beserta migrasinya."""
+    global _conn
+    with _conn_lock:
+        if _conn is None:
+            conn = connect(USER_DB_FILE)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    first_name TEXT,
+                    username TEXT,
+                    usage_count INTEGER NOT NULL DEFAULT 0,
+                    first_used TEXT,
+                    last_used TEXT,
+                    last_mode TEXT
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_last_used ON users(last_used)")
+            _migrate_from_json(conn)
+            _conn = conn
+    return _conn
+
+def _migrate_from_json(conn: sqlite3.Connection):
+    """Memindahkan data dari user_data.json (format lama) ke SQLite, satu kali saja."""
+    if not os.path.exists(USER_DATA_FILE):
+        return
+    try:
+        with open(USER_DATA_FILE, 'r') as f:
+            users = json.load(f) if os.path.getsize(USER_DATA_FILE) > 0 else {}
+    except json.JSONDecodeError:
+        users = {}
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (user_id, first_name, username, usage_count, first_used, last_used, last_mode) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(int(uid), data.get('first_name'), data.get('username', 'N/A'), data.get('usage_count', 0),
+              data.get('first_used'), data.get('last_used'), data.get('last_mode')) for uid, data in users.items()])
+    os.replace(USER_DATA_FILE, f"{USER_DATA_FILE}.migrated")
+    logger.info(f"📦 {len(users)} pengguna dimigrasikan dari {USER_DATA_FILE} ke {USER_DB_FILE}.")
 
 def track_user(user, mode: str):
-    """Melacak aktivitas pengguna dengan file locking."""
-    lock = FileLock(f"{USER_DATA_FILE}.lock", timeout=10)
-    with lock:
-        users = load_user_data()
-        user_id = str(user.id)
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if user_id in users:
-            users[user_id]['usage_count'] += 1
-            users[user_id]['last_used'] = now
-            users[user_id]['last_mode'] = mode
-        else:
-            users[user_id] = {
-                'first_name': user.first_name,
-                'username': user.username or 'N/A',
-                'usage_count': 1,
-                'first_used': now,
-                'last_used': now,
-                'last_mode': mode
-            }
-        save_user_data(users)
\ No newline at end of file
+    """Melacak aktivitas pengguna dengan satu upsert per unggahan."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _get_connection().execute("""
+        INSERT INTO users (user_id, first_name, username, usage_count, first_used, last_used, last_mode)
+        VALUES (?, ?, ?, 1, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            usage_count = usage_count + 1,
+            last_used = excluded.last_used,
+            last_mode = excluded.last_mode
+        """, (user.id, user.first_name, user.username or 'N/A', now, now, mode))
+
+def count_users() -> int:
+    """Menghitung jumlah pengguna yang tercatat."""
+    return _get_connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+def get_users_page(page: int, page_size: int) -> list[dict]:
+    """Mengambil satu halaman pengguna, diurutkan dari yang terakhir aktif."""
+    rows = _get_connection().execute(
+        "SELECT * FROM users ORDER BY last_used DESC LIMIT ? OFFSET ?",
+        (page_size, max(page - 1, 0) * page_size)).fetchall()
+    return [dict(row) for row in rows]
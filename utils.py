@@ -1,92 +1,285 @@
 # utils.py
-import os
-import fitz
-import docx
 import io
+import os
+import re
+import math
 import logging
-import difflib
-from spellchecker import SpellChecker
-from config import MAX_CHUNK_SIZE
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Iterator
+from config import MAX_CHUNK_TOKENS, CHARS_PER_TOKEN, SPELL_LANGUAGE, SPELL_CORRECTION_CACHE_SIZE
+
+# Pustaka format dokumen dan kamus ejaan cukup berat; diimpor saat pertama kali dipakai agar start bot cepat
+if TYPE_CHECKING:
+    import fitz
+    from spellchecker import SpellChecker
 
 logger = logging.getLogger(__name__)
 
-def extract_text(file_path: str) -> tuple[str | None, str | None]:
-    """Mengekstrak teks dari file txt, pdf, dan docx."""
-    ext = os.path.splitext(file_path)[-1].lower()
+_WORD_RE = re.compile(r"\S+")
+_PUNCTUATION = ".,!?;:()[]{}"
+# Pemisah untuk memecah paragraf yang terlalu besar; pemisah ikut ditangkap agar potongan dapat
+# disambung kembali persis seperti teks asli
+_LINE_BREAK_RE = re.compile(r"(\n)")
+_SENTENCE_END_RE = re.compile(r"((?<=[.!?…])\s+)")
+_WHITESPACE_RE = re.compile(r"(\s+)")
+_PARAGRAPH_SEPARATOR_TOKENS = 1
+
+_spell_checker: "SpellChecker | None" = None
+_spell_checker_failed = False
+_spell_checker_lock = threading.Lock()
+
+UNSUPPORTED_FORMAT_MESSAGE = "❌ Format file tidak didukung. Silakan kirim .txt, .pdf, atau .docx."
+CORRUPT_FILE_MESSAGE = "❌ Gagal memproses file. File mungkin rusak atau terenkripsi."
+
+# Jumlah baris .txt yang digabung menjadi satu potongan saat streaming
+_TXT_LINES_PER_SEGMENT = 2000
+
+class ExtractionError(Exception):
+    """Kegagalan ekstraksi teks; pesannya siap ditampilkan ke pengguna."""
+
+# Dokumen dapat berupa path berkas atau isi berkas di memori (bytes)
+DocumentSource = str | bytes
+
+@contextmanager
+def _extraction_errors(label: str):
+    """Mengubah error pustaka format file menjadi ExtractionError (aman dikirim antar-proses)."""
     try:
-        with open(file_path, "rb") as f:
-            content = f.read()
-        if ext == ".txt":
-            return content.decode("utf-8", errors='ignore'), None
-        if ext == ".pdf":
-            with fitz.open(stream=content, filetype="pdf") as doc:
-                return "\n".join(page.get_text() for page in doc), None
-        if ext == ".docx":
-            doc = docx.Document(io.BytesIO(content))
-            return "\n".join(p.text for p in doc.paragraphs), None
-        return None, "❌ Format file tidak didukung. Silakan kirim .txt, .pdf, atau .docx."
+        yield
+    except ExtractionError:
+        raise
     except Exception as e:
-        logger.error(f"Error saat ekstrak teks dari {file_path}: {e}")
-        return None, f"❌ Gagal memproses file. File mungkin rusak atau terenkripsi."
-
-def split_text_into_logical_chunks(text: str, max_chunk_size: int = MAX_CHUNK_SIZE) -> list:
-    """Memecah teks menjadi beberapa bagian dengan ukuran tertentu, secara cerdas berdasarkan paragraf."""
-    paragraphs = text.split('\n\n')
-    chunks = []
-    current_chunk = ""
-    for paragraph in paragraphs:
-        if len(current_chunk) + len(paragraph) + 2 <= max_chunk_size:
-            current_chunk += paragraph + "\n\n"
+        logger.error(f"Error saat ekstrak teks dari {label}: {e}")
+        raise ExtractionError(CORRUPT_FILE_MESSAGE) from None
+
+def _source_label(source: DocumentSource, file_name: str | None = None) -> str:
+    return file_name or (source if isinstance(source, str) else "dokumen di memori")
+
+def _open_pdf(source: DocumentSource) -> "fitz.Document":
+    import fitz
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def iter_text_segments(source: DocumentSource, file_name: str | None = None) -> Iterator[str]:
+    """Mengekstrak teks secara bertahap: per halaman (pdf), per paragraf (docx), atau per blok baris (txt).
+
+    `source` berupa path atau isi berkas (bytes); untuk bytes, format ditentukan dari `file_name`.
+    Menggabungkan semua potongan dengan "\n" menghasilkan teks utuh dokumen.
+    """
+    ext = os.path.splitext(file_name or (source if isinstance(source, str) else ""))[-1].lower()
+    if ext == ".txt":
+        if isinstance(source, str):
+            f = open(source, "r", encoding="utf-8", errors="ignore")
         else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = paragraph + "\n\n"
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    return chunks
-
-def generate_diff_report(original_text: str, corrected_text: str) -> str:
-    """Membuat laporan perbandingan antara teks asli dan teks yang dikoreksi."""
-    if original_text.strip() == corrected_text.strip():
-        return "✅ Tidak ada perubahan signifikan yang terdeteksi."
-
-    diff = difflib.unified_diff(
-        original_text.splitlines(keepends=True),
-        corrected_text.splitlines(keepends=True),
-        fromfile='Teks Asli', tofile='Teks Koreksi', n=2,
-    )
-    
-    report_lines = list(diff)
-    if not report_lines:
-        return "✅ Tidak ada perbedaan format baris yang terdeteksi."
-
-    report = "📝 *Laporan Perubahan Teks (Contoh):*\n\n```diff\n"
-    # Batasi jumlah baris agar tidak terlalu panjang
-    for line in report_lines[:25]:
-        if line.startswith(('---', '+++', '@@')): continue
-        report += line
-    
-    report += "```\n"
-    if len(report_lines) > 25:
-        report += "_(Laporan dipotong agar tidak terlalu panjang)_"
-        
-    return report
-
-def final_spell_check(text: str) -> str:
-    """Melakukan pengecekan ejaan lapisan kedua pada teks."""
+            f = io.TextIOWrapper(io.BytesIO(source), encoding="utf-8", errors="ignore")
+        with f:
+            lines = []
+            for line in f:
+                lines.append(line.rstrip("\n"))
+                if len(lines) >= _TXT_LINES_PER_SEGMENT:
+                    yield "\n".join(lines)
+                    lines = []
+            if lines:
+                yield "\n".join(lines)
+    elif ext == ".pdf":
+        with _open_pdf(source) as doc:
+            for page in doc:
+                yield page.get_text()
+    elif ext == ".docx":
+        import docx
+        for paragraph in docx.Document(source if isinstance(source, str) else io.BytesIO(source)).paragraphs:
+            yield paragraph.text
+    else:
+        raise ExtractionError(UNSUPPORTED_FORMAT_MESSAGE)
+
+def iter_segments_checked(source: DocumentSource, file_name: str | None = None) -> Iterator[str]:
+    """Seperti iter_text_segments, tetapi error pustaka format diubah menjadi ExtractionError."""
+    with _extraction_errors(_source_label(source, file_name)):
+        yield from iter_text_segments(source, file_name)
+
+def extract_segments(source: DocumentSource, file_name: str | None = None) -> list[str]:
+    """Versi iter_text_segments yang dapat dijalankan di pool pekerja."""
+    with _extraction_errors(_source_label(source, file_name)):
+        return list(iter_text_segments(source, file_name))
+
+def pdf_page_count(source: DocumentSource) -> int:
+    """Menghitung jumlah halaman PDF tanpa mengekstrak isinya."""
+    with _extraction_errors(_source_label(source)), _open_pdf(source) as doc:
+        return doc.page_count
+
+def extract_pdf_pages(source: DocumentSource, start: int, end: int) -> list[str]:
+    """Mengekstrak teks halaman PDF pada rentang [start, end) untuk diproses paralel."""
+    with _extraction_errors(_source_label(source)), _open_pdf(source) as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+def estimate_tokens(text: str) -> int:
+    """Memperkirakan jumlah token teks tanpa memuat tokenizer model."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _pack_units(units: Iterable[str], separator: str, max_tokens: int) -> Iterator[str]:
+    """Menggabungkan unit teks berurutan menjadi potongan sebesar mungkin yang tidak melebihi max_tokens."""
+    separator_tokens = estimate_tokens(separator)
+    packed: list[str] = []
+    packed_tokens = 0
+    for unit in units:
+        tokens = estimate_tokens(unit)
+        if packed and packed_tokens + separator_tokens + tokens > max_tokens:
+            yield separator.join(packed)
+            packed, packed_tokens = [], 0
+        packed.append(unit)
+        packed_tokens += tokens + (separator_tokens if len(packed) > 1 else 0)
+    if packed:
+        yield separator.join(packed)
+
+def _split_keeping_separators(text: str, pattern: re.Pattern) -> list[str]:
+    """Memecah teks dengan `pattern` (satu grup tangkap); setiap potongan membawa pemisah di belakangnya."""
+    parts = pattern.split(text)
+    return [piece for piece in map(str.__add__, parts[::2], parts[1::2] + [""]) if piece]
+
+def _split_oversized(text: str, max_tokens: int) -> Iterator[str]:
+    """Memecah teks yang melebihi anggaran per baris, lalu per kalimat, lalu per kata, lalu per karakter.
+
+    Spasi dan baris baru asli dipertahankan: potongan yang dihasilkan, jika disambung, sama persis dengan `text`.
+    """
+    def units():
+        for line in _split_keeping_separators(text, _LINE_BREAK_RE):
+            if estimate_tokens(line) <= max_tokens:
+                yield line
+                continue
+            for sentence in _split_keeping_separators(line, _SENTENCE_END_RE):
+                if estimate_tokens(sentence) <= max_tokens:
+                    yield sentence
+                    continue
+                for word in _split_keeping_separators(sentence, _WHITESPACE_RE):
+                    if estimate_tokens(word) <= max_tokens:
+                        yield word
+                    else:
+                        step = max(1, int(max_tokens * CHARS_PER_TOKEN))
+                        yield from (word[i:i + step] for i in range(0, len(word), step))
+    return _pack_units(units(), "", max_tokens)
+
+class LogicalChunker:
+    """Memecah teks menjadi chunk berdasarkan paragraf secara bertahap, dari potongan yang datang berurutan.
+
+    Potongan diperlakukan seolah digabung dengan "\n"; baris kosong menandai batas paragraf.
+    Ukuran chunk dibatasi perkiraan token; paragraf yang terlalu besar dipecah per baris, kalimat, lalu kata
+    tanpa mengubah spasi dan baris barunya.
+    """
+
+    def __init__(self, max_tokens: int = MAX_CHUNK_TOKENS):
+        self.max_tokens = max_tokens
+        self._lines: list[str] = []       # baris paragraf yang sedang dibaca
+        self._paragraphs: list[str] = []  # paragraf dalam chunk yang sedang disusun
+        self._tokens = 0
+
+    def feed(self, segment: str) -> list[str]:
+        """Menambahkan potongan teks dan mengembalikan chunk yang sudah lengkap."""
+        ready = []
+        for line in segment.split("\n"):
+            if line.strip():
+                self._lines.append(line)
+            elif self._lines:
+                self._close_paragraph(ready)
+        return ready
+
+    def finish(self) -> list[str]:
+        """Mengembalikan sisa chunk setelah potongan terakhir."""
+        ready = []
+        if self._lines:
+            self._close_paragraph(ready)
+        self._flush(ready)
+        return ready
+
+    def _close_paragraph(self, ready: list[str]):
+        paragraph = "\n".join(self._lines)
+        self._lines = []
+        tokens = estimate_tokens(paragraph)
+        if tokens <= self.max_tokens:
+            self._append(paragraph, tokens, ready)
+            return
+        for n, piece in enumerate(_split_oversized(paragraph, self.max_tokens)):
+            if n:
+                # Potongan paragraf yang sama tidak boleh dipisah baris kosong di dalam satu chunk
+                self._flush(ready)
+            self._append(piece, estimate_tokens(piece), ready)
+
+    def _append(self, paragraph: str, tokens: int, ready: list[str]):
+        if self._paragraphs and self._tokens + _PARAGRAPH_SEPARATOR_TOKENS + tokens > self.max_tokens:
+            self._flush(ready)
+        if self._paragraphs:
+            self._tokens += _PARAGRAPH_SEPARATOR_TOKENS
+        self._paragraphs.append(paragraph)
+        self._tokens += tokens
+
+    def _flush(self, ready: list[str]):
+        if self._paragraphs:
+            ready.append("\n\n".join(self._paragraphs).strip())
+            self._paragraphs, self._tokens = [], 0
+
+def split_text_into_logical_chunks(text: str, max_tokens: int = MAX_CHUNK_TOKENS) -> list:
+    """Memecah teks menjadi beberapa bagian sesuai anggaran token, secara cerdas berdasarkan paragraf.
+
+    Pipeline memakai LogicalChunker secara bertahap; fungsi ini dipertahankan untuk teks utuh (bench_chunker).
+    """
+    chunker = LogicalChunker(max_tokens)
+    return chunker.feed(text) + chunker.finish()
+
+def get_spell_checker() -> "SpellChecker | None":
+    """Mengembalikan SpellChecker bersama; kamus hanya dimuat sekali per proses."""
+    global _spell_checker, _spell_checker_failed
+    if _spell_checker is None and not _spell_checker_failed:
+        with _spell_checker_lock:
+            if _spell_checker is None and not _spell_checker_failed:
+                try:
+                    from spellchecker import SpellChecker
+                    _spell_checker = SpellChecker(language=SPELL_LANGUAGE)
+                except Exception as e:
+                    # Jangan mencoba memuat ulang kamus yang gagal di setiap dokumen
+                    _spell_checker_failed = True
+                    logger.error(f"Gagal memuat kamus ejaan '{SPELL_LANGUAGE}': {e}")
+    return _spell_checker
+
+@lru_cache(maxsize=SPELL_CORRECTION_CACHE_SIZE)
+def _correct_word(word: str) -> str | None:
+    """Mencari koreksi untuk satu kata (hasil disimpan lintas dokumen)."""
+    return get_spell_checker().correction(word)
+
+def correct_words(words: Iterable[str]) -> dict[str, str | None]:
+    """Mengoreksi sekumpulan kata sekaligus; setiap kata unik yang salah eja hanya dicari sekali.
+
+    Mengembalikan peta kata salah eja (huruf kecil) -> koreksi, atau None jika tidak ada koreksi.
+    """
+    spell = get_spell_checker()
+    if spell is None:
+        return {}
+    unique_words = {word.lower() for word in words if word}
+    return {word: _correct_word(word) for word in spell.unknown(unique_words)}
+
+def final_spell_check_chunks(chunks: list[str]) -> list[str]:
+    """Pengecekan ejaan lapisan kedua per chunk tanpa mengubah spasi dan baris baru.
+
+    Kata salah eja dikumpulkan dari seluruh chunk sehingga setiap kata unik hanya dikoreksi sekali.
+    """
     try:
-        spell = SpellChecker(language='id')
-        words = text.split()
-        misspelled = spell.unknown(words)
-        
-        corrected_words = [
-            word.replace(
-                (clean_word := word.strip(".,!?;:()[]{}")),
-                (correction if (correction := spell.correction(clean_word)) else clean_word)
-            ) if clean_word.lower() in misspelled else word
-            for word in words
-        ]
-        return " ".join(corrected_words)
+        corrections = correct_words(word.strip(_PUNCTUATION) for chunk in chunks for word in _WORD_RE.findall(chunk))
+        if not corrections:
+            return list(chunks)
+
+        def fix_word(match: re.Match) -> str:
+            word = match.group(0)
+            clean_word = word.strip(_PUNCTUATION)
+            correction = corrections.get(clean_word.lower())
+            return word.replace(clean_word, correction) if correction else word
+
+        return [_WORD_RE.sub(fix_word, chunk) for chunk in chunks]
     except Exception as e:
         logger.error(f"Gagal melakukan final spell check: {e}")
-        return text
\ No newline at end of file
+        return list(chunks)
+
+def warm_up_worker():
+    """Memuat pustaka format dokumen dan kamus ejaan di proses pekerja sebelum dokumen pertama datang."""
+    import fitz
+    import docx
+    get_spell_checker()
@@ -0,0 +1,62 @@
+# workers.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from config import CPU_POOL_KIND, CPU_POOL_WORKERS, CPU_MAX_QUEUED_JOBS
+
+logger = logging.getLogger(__name__)
+
+_executor: Executor | None = None
+_job_slots: asyncio.Semaphore | None = None
+
+def get_executor() -> Executor:
+    """Mengembalikan pool pekerja bersama untuk tahap berat CPU (dibuat saat pertama kali dipakai)."""
+    global _executor
+    if _executor is None:
+        if CPU_POOL_KIND == 'thread':
+            _executor = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="cpu-worker")
+        else:
+            # 'spawn' menghindari fork dari proses yang sudah menjalankan thread event loop
+            _executor = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"⚙️ Pool pekerja '{CPU_POOL_KIND}' dibuat dengan {CPU_POOL_WORKERS} pekerja.")
+    return _executor
+
+async def run_cpu(func: Callable[..., Any], *args) -> Any:
+    """Menjalankan fungsi berat CPU di pool pekerja tanpa memblokir event loop.
+
+    Jumlah pekerjaan yang dikirim ke pool dibatasi CPU_MAX_QUEUED_JOBS; pemanggil lain menunggu giliran.
+    """
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(CPU_MAX_QUEUED_JOBS)
+    async with _job_slots:
+        executor = get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            _discard_broken_executor(executor)
+            raise
+
+def _discard_broken_executor(executor: Executor):
+    """Membuang pool yang rusak agar panggilan berikutnya membuat pool baru.
+
+    Pool rusak jika proses pekerja mati (mis. PyMuPDF crash atau kehabisan memori pada PDF bermasalah);
+    tanpa ini satu dokumen bermasalah menghentikan pemrosesan untuk semua pengguna.
+    """
+    global _executor
+    if _executor is executor:
+        logger.error("⚠️ Proses pekerja mati mendadak; pool pekerja dibuat ulang.")
+        _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_workers():
+    """Menghentikan pool pekerja dan membatalkan pekerjaan yang belum dimulai."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None